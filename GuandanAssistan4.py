@@ -1,15 +1,37 @@
+import os
 import sys
+import time
 import random
-from collections import defaultdict
+import argparse
+from collections import defaultdict, deque, Counter
+from difflib import SequenceMatcher
+from itertools import islice
+from functools import partial
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import util
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QLabel, 
                             QFileDialog, QLineEdit, QVBoxLayout, QWidget, 
-                            QListWidget, QHBoxLayout, QTextEdit, 
+                            QListWidget, QListView, QHBoxLayout, QTextEdit, QPlainTextEdit, 
                             QGroupBox, QGridLayout, QMessageBox, QSizePolicy)
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import (Qt, QTimer, QThread, pyqtSignal, QAbstractListModel, QModelIndex,
+                          QItemSelection, QItemSelectionModel)
+from PyQt5.QtGui import QKeySequence, QTextCursor
 from datetime import datetime
+from GuandanEndgame import (EndgameSolver, counts_from_values, apply_move, WIN_SCORE,
+                            RUN_SHAPES, SET_SIZES)
+from GuandanOpeningBook import default_book
+from GuandanState import GameState, ME, OPPONENT, SUITS, CARD_NAMES
+from GuandanMoves import MoveIndex, bomb_strength
+from GuandanEvaluator import default_evaluator
+from GuandanPolicy import default_policy
+from GuandanShared import SharedSearchState, read_state
 
 # 扑克牌识别器（模拟版）
 class CardRecognizer:
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else random.Random()  # 可注入的随机数生成器
+    
     def recognize_cards(self, image_path):
         """模拟图像识别过程"""
         suits = ["红桃", "方块", "梅花", "黑桃"]
@@ -17,72 +39,436 @@ class CardRecognizer:
         # 确保不重复
         cards = set()
         while len(cards) < 13:  # 掼蛋每人13张牌
-            card = f"{random.choice(suits)}{random.choice(values)}"
+            card = f"{self.rng.choice(suits)}{self.rng.choice(values)}"
             cards.add(card)
         return list(cards)
 
+# 随机策略从代价最小的若干个先手出牌中选取
+RANDOM_CANDIDATES = 40
+
 # 增强的掼蛋AI引擎
 class GuandanAI:
-    def __init__(self):
+    def __init__(self, endgame_threshold=8, endgame_node_budget=50000, opening_book=None,
+                 evaluator=None, workers=None, search_time=1.0, rng=None, policy=None, seed=None,
+                 endgame_solver=None):
+        self.endgame_threshold = endgame_threshold  # 手牌不超过该张数时启用残局求解
+        # 残局求解器（含置换表），可与复制出的AI共用
+        self.endgame_solver = (endgame_solver if endgame_solver is not None
+                               else EndgameSolver(node_budget=endgame_node_budget))
+        self.opening_book = opening_book if opening_book is not None else default_book()
+        self.evaluator = evaluator if evaluator is not None else default_evaluator()  # 手牌强度评估
+        self.policy = policy if policy is not None else default_policy()  # 可选的策略网络，没有权重文件时为None
+        self.workers = workers          # 并行评估候选出牌的进程数（None或1表示不并行）
+        self.search_time = search_time  # 每次建议的搜索时间上限（秒）
+        self.rng = rng if rng is not None else random.Random()  # 随机策略使用的随机数生成器
+        self.seed = seed  # 复制出的AI按 种子+牌局版本 派生随机数生成器，None时从rng中抽取
+        self._pool = None
+        self._owns_pool = True  # 复制出的AI共用原AI的进程池，不负责关闭
+        self._shared = None     # 与进程池配套的共享牌局状态（GuandanShared），不可用时为None
+        self.state = GameState()  # 手牌、已出牌、当前轮等牌局状态
+        self._undo_stack = deque(maxlen=256)  # 每项为一次操作的差异列表
+        self._redo_stack = []
+        self._action_deltas = None  # 正在合并的操作差异
+        self._move_index = None  # 当前手牌的出牌索引
+        self._hand_listeners = []  # 手牌变化时的回调，参数为新的手牌列表
         self.reset_game()
         self._last_suggestion = []  # 缓存上次建议
     
+    # 牌局状态保存在紧凑的 GameState 中，以下属性保持原有接口
+    @property
+    def hand_cards(self):
+        """当前手牌（按牌值排序）"""
+        return self.state.hand_list()
+    
+    @hand_cards.setter
+    def hand_cards(self, cards):
+        self.state.set_hand(cards)
+    
+    @property
+    def played_cards(self):
+        """已出牌列表"""
+        return self.state.played_list()
+    
+    @played_cards.setter
+    def played_cards(self, cards):
+        self.state.set_played(cards)
+    
+    @property
+    def opponent_history(self):
+        """对手出牌历史"""
+        return self.state.history
+    
+    @property
+    def round_count(self):
+        """当前轮次"""
+        return self.state.round_count
+    
+    @round_count.setter
+    def round_count(self, count):
+        self.state.round_count = count
+    
+    @property
+    def current_turn(self):
+        """当前出牌方: me/opponent"""
+        return "me" if self.state.turn == ME else "opponent"
+    
+    @current_turn.setter
+    def current_turn(self, turn):
+        self.state.turn = ME if turn == "me" else OPPONENT
+    
+    @property
+    def current_round_cards(self):
+        """当前轮对手出的牌"""
+        return list(self.state.round_cards)
+    
+    @current_round_cards.setter
+    def current_round_cards(self, cards):
+        self.state.round_cards = tuple(cards)
+    
+    @property
+    def opponent_card_type(self):
+        """对手出牌类型"""
+        return self.state.round_type
+    
+    @opponent_card_type.setter
+    def opponent_card_type(self, card_type):
+        self.state.round_type = card_type
+    
     def reset_game(self):
-        """重置游戏状态"""
-        self.hand_cards = []         # 当前手牌
-        self.played_cards = []       # 已出牌列表
-        self.opponent_history = []   # 对手出牌历史
-        self.round_count = 0         # 当前轮次
-        self.current_turn = "me"     # 当前出牌方: me/opponent
-        self.current_round_cards = [] # 当前轮对手出的牌
-        self.opponent_card_type = None  # 对手出牌类型
+        """重置游戏状态（新的一局，上一局的残局置换表不会再命中，一并清空）"""
+        self._reset_state()
+        self.endgame_solver.clear()
+    
+    def _reset_state(self):
+        """清空牌局状态（载入外部局面时使用，保留置换表供同一局的后续局面复用）"""
+        self.state.reset()
+        self.opponent_hand_cards = None  # 已知的对手剩余手牌（未知为None）
+        self._undo_stack.clear()
+        self._redo_stack = []
         self._last_suggestion = []   # 清空缓存
+        self._hand_changed()
+    
+    def state_key(self):
+        """牌局的版本标识，牌局（含已知的对手手牌）有变化时必然不同"""
+        opponent = None if self.opponent_hand_cards is None else tuple(self.opponent_hand_cards)
+        return (self.state.version, opponent)
+    
+    def add_hand_listener(self, listener):
+        """注册手牌变化回调（界面据此增量刷新手牌列表）"""
+        self._hand_listeners.append(listener)
+    
+    def _hand_changed(self):
+        """通知手牌监听者"""
+        if self._hand_listeners:
+            cards = self.hand_cards
+            for listener in self._hand_listeners:
+                listener(cards)
+    
+    def _record(self, delta):
+        """记录一次修改的差异，供撤销使用"""
+        if self._action_deltas is not None:
+            self._action_deltas.append(delta)
+        else:
+            self._undo_stack.append([delta])
+        self._redo_stack = []
+    
+    @contextmanager
+    def action(self):
+        """把多步修改合并为一次可撤销的操作（例如出牌后重置轮次）"""
+        if self._action_deltas is not None:
+            yield  # 已在合并中，直接并入外层操作
+            return
+        self._action_deltas = []
+        try:
+            yield
+        finally:
+            deltas, self._action_deltas = self._action_deltas, None
+            if deltas:
+                self._undo_stack.append(deltas)
+    
+    def can_undo(self):
+        return bool(self._undo_stack)
+    
+    def can_redo(self):
+        return bool(self._redo_stack)
+    
+    def undo(self):
+        """撤销上一次操作，成功返回True"""
+        if not self._undo_stack:
+            return False
+        deltas = self._undo_stack.pop()
+        for delta in reversed(deltas):
+            self._undo_delta(delta)
+        self._redo_stack.append(deltas)
+        self._last_suggestion = []
+        self._hand_changed()
+        return True
+    
+    def redo(self):
+        """重做上一次撤销的操作，成功返回True"""
+        if not self._redo_stack:
+            return False
+        deltas = [self._redo_delta(delta) for delta in self._redo_stack.pop()]
+        self._undo_stack.append(deltas)
+        self._last_suggestion = []
+        self._hand_changed()
+        return True
+    
+    # 已知对手手牌的差异为 ("opponent_hand", 修改前, 修改后)，两者都是牌的元组或None，
+    # 撤销/重做时整体替换，不依赖当时的对手手牌列表是否还是同一个对象
+    def _undo_delta(self, delta):
+        if delta[0] == "opponent_hand":
+            self._set_opponent_hand(delta[1])
+        else:
+            self.state.undo(delta)
+    
+    def _redo_delta(self, delta):
+        if delta[0] == "opponent_hand":
+            self._set_opponent_hand(delta[2])
+            return delta
+        return self.state.redo(delta)
+    
+    def _set_opponent_hand(self, cards):
+        self.opponent_hand_cards = list(cards) if cards is not None else None
+    
+    def _opponent_hand_snapshot(self):
+        return tuple(self.opponent_hand_cards) if self.opponent_hand_cards is not None else None
     
     def update_hand(self, cards):
         """更新当前手牌"""
-        self.hand_cards = sorted(cards, key=self.card_value)
+        self._record(self.state.set_hand(cards))
         self._last_suggestion = []  # 手牌更新后重置缓存
+        self._hand_changed()
     
     def record_opponent_play(self, cards):
         """记录对手出牌"""
         if cards:
             # 识别对手出牌类型
-            self.opponent_card_type = self._identify_card_type(cards)
-            self.opponent_history.append((self.round_count, cards, self.opponent_card_type))
-            self.current_round_cards = cards
-            self.current_turn = "me"  # 对手出牌后轮到我们
+            card_type = self._identify_card_type(cards)
+            with self.action():
+                self._record(self.state.record_round(cards, card_type))  # 对手出牌后轮到我们
+                # 对手手牌已知时同步扣除
+                if self.opponent_hand_cards is not None:
+                    before = self._opponent_hand_snapshot()
+                    for card in cards:
+                        if card in self.opponent_hand_cards:
+                            self.opponent_hand_cards.remove(card)
+                    self._record(("opponent_hand", before, self._opponent_hand_snapshot()))
             self._last_suggestion = []  # 对手出牌后重置缓存
     
+    def record_opponent_hand(self, cards):
+        """记录已知的对手剩余手牌（残局精确求解使用，可撤销）"""
+        before = self._opponent_hand_snapshot()
+        self._set_opponent_hand(cards)
+        self._record(("opponent_hand", before, self._opponent_hand_snapshot()))
+        self._last_suggestion = []
+    
     def record_my_play(self, cards):
         """记录我方出牌"""
         if cards:
-            self.played_cards.extend(cards)
-            # 从手牌中移除
-            for card in cards:
-                if card in self.hand_cards:
-                    self.hand_cards.remove(card)
-            self.round_count += 1
-            self.current_turn = "opponent"  # 我方出牌后轮到对手
-            self.current_round_cards = []   # 重置当前轮
-            self.opponent_card_type = None   # 重置对手牌型
+            # 从手牌移入已出牌，轮到对手，重置当前轮
+            self._record(self.state.play(cards))
             self._last_suggestion = []  # 我方出牌后重置缓存
+            self._hand_changed()
+    
+    def load_state(self, hand, to_beat=None, seen=None, turn="me"):
+        """载入外部牌局状态（批量接口和服务使用）"""
+        self._reset_state()
+        self.state.set_hand(hand)
+        self.state.set_played(seen or [])
+        self._hand_changed()
+        self.current_turn = turn
+        if to_beat:
+            self.state.round_cards = tuple(to_beat)
+            self.state.round_type = self._identify_card_type(to_beat)
+    
+    def snapshot(self):
+        """保存牌局快照（搜索分支时使用）"""
+        return self.state.snapshot()
+    
+    def restore(self, snapshot):
+        """恢复牌局快照"""
+        self.state.restore(snapshot)
+        self._last_suggestion = []
+        self._hand_changed()
     
     def reset_round(self):
         """重置当前轮次状态"""
-        self.current_round_cards = []
-        self.opponent_card_type = None
-        self.current_turn = "opponent" if self.current_turn == "me" else "me"
+        self._record(self.state.end_round())
         self._last_suggestion = []  # 重置缓存
     
-    def suggest_play(self, force_recalculate=False):
-        """生成出牌建议"""
+    def suggest_play(self, force_recalculate=False, deadline=None):
+        """生成出牌建议
+        
+        deadline 为所有候选共用的截止时间（time.time()），默认为当前时间加 search_time。
+        """
         # 如果强制重新计算或缓存为空，则重新计算
         if force_recalculate or not self._last_suggestion:
-            self._last_suggestion = self._calculate_suggestion()
+            if deadline is None:
+                deadline = time.time() + self.search_time
+            options = self._calculate_suggestion(deadline)
+            if len(options) > 1 and self.opponent_hand_cards:
+                options = self._search_rank(options, deadline)
+            self._last_suggestion = options
         return self._last_suggestion
     
-    def _calculate_suggestion(self):
+    def _search_rank(self, options, deadline):
+        """对手手牌已知时搜索评估各候选出牌，截止时间到后取消剩余任务
+        
+        返回按搜索结果重新排序的候选：必胜在前，未完成评估的保持原顺序，必败在后。
+        """
+        opp_values = [self.card_value(card) for card in self.opponent_hand_cards]
+        if self.state.extra or 0 in opp_values:
+            return options
+        opp_counts = counts_from_values(opp_values)
+        
+        jobs = []  # (候选牌, 求解器出牌)
+        seen = set()
+        for option in options:
+            key = tuple(option["cards"])
+            if not key or key in seen:
+                continue  # 相同的候选只评估一次
+            seen.add(key)
+            move = self._card_type_to_move(self._identify_card_type(option["cards"]))
+            if move is None:
+                continue  # 求解器不支持的牌型
+            jobs.append((key, move))
+        
+        results = {}  # 候选牌 -> 搜索分数
+        node_budget = self.endgame_solver.node_budget
+        pool = self._executor()
+        if pool is None:
+            # 串行评估，到截止时间即停止
+            for key, move in jobs:
+                if time.time() >= deadline:
+                    break
+                results[key] = _evaluate_candidate(self._residual_counts(key), opp_counts, move,
+                                                   node_budget, deadline, self.endgame_solver)
+        else:
+            if self._shared is not None:
+                # 牌局状态只写入共享内存一次，每个任务只传槽位引用和候选出牌
+                state_ref = self._shared.publish(tuple(self.state.rank_counts), opp_counts,
+                                                 node_budget, deadline)
+                futures = {pool.submit(_evaluate_shared, state_ref, move): key for key, move in jobs}
+            else:
+                futures = {pool.submit(_evaluate_candidate, self._residual_counts(key), opp_counts,
+                                       move, node_budget, deadline): key for key, move in jobs}
+            done, not_done = wait(futures, timeout=max(0.0, deadline - time.time()))
+            for future in not_done:
+                future.cancel()
+            for future in done:
+                if not future.cancelled() and future.exception() is None:
+                    results[futures[future]] = future.result()
+        
+        # 搜索结果: 1为必胜，-1为必败，未完成评估为None
+        for option in options:
+            score = results.get(tuple(option["cards"]))
+            option["search_score"] = None if score is None else (1 if score > 0 else -1)
+        return sorted(options, key=lambda option: -(option["search_score"] or 0))
+    
+    def suggest_progressive(self, deadline=None):
+        """逐步生成出牌建议
+        
+        先立即给出启发式建议，再依次给出残局/开局库分析和对手手牌已知时的
+        搜索排序结果；每次产出完整的候选列表，调用方可随时停止迭代。
+        """
+        if deadline is None:
+            deadline = time.time() + self.search_time
+        options = self._heuristic_suggestion()
+        yield options
+        
+        lead_options = options if not self.current_round_cards else None
+        deeper = self._analyzed_suggestion(lead_options, deadline)
+        if deeper:
+            options = deeper
+            yield options
+        
+        if len(options) > 1 and self.opponent_hand_cards:
+            options = self._search_rank([dict(option) for option in options], deadline)
+            yield options
+        self._last_suggestion = options
+    
+    def fork(self):
+        """复制一个牌局相同的AI，供后台线程计算建议，不与界面共享可变状态
+        
+        残局求解器除外：共用同一个求解器（求解时加锁），置换表在多次建议之间复用。
+        """
+        if self.seed is not None:
+            # 只由种子和牌局版本决定，不消耗本AI的随机数，按记录的会话种子重放同样的操作即可复现
+            rng = random.Random(f"{self.seed}-{self.state.version}")
+        else:
+            rng = random.Random(self.rng.getrandbits(64))
+        other = GuandanAI(endgame_threshold=self.endgame_threshold, endgame_solver=self.endgame_solver,
+                          opening_book=self.opening_book, evaluator=self.evaluator,
+                          workers=self.workers, search_time=self.search_time,
+                          rng=rng, policy=self.policy, seed=self.seed)
+        other.state.history.extend(self.state.history)
+        other.state.restore(self.state.snapshot())
+        if self.opponent_hand_cards is not None:
+            other.opponent_hand_cards = list(self.opponent_hand_cards)
+        other._pool = self._executor()
+        other._shared = self._shared
+        other._owns_pool = False
+        return other
+    
+    def _executor(self):
+        """按需创建候选评估进程池"""
+        if self.workers is None or self.workers <= 1:
+            return None
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            try:
+                self._shared = SharedSearchState()
+            except OSError:
+                self._shared = None  # 不支持共享内存时退回按任务传递完整参数
+        return self._pool
+    
+    def close(self):
+        """关闭候选评估进程池和共享牌局状态"""
+        if self._pool is not None:
+            if self._owns_pool:
+                self._pool.shutdown(cancel_futures=True)
+                if self._shared is not None:
+                    self._shared.close()
+            self._pool = None
+            self._shared = None
+    
+    def _calculate_suggestion(self, deadline=None):
         """实际计算建议的核心方法"""
+        return self._analyzed_suggestion(deadline=deadline) or self._heuristic_suggestion()
+    
+    def _analyzed_suggestion(self, lead_options=None, deadline=None):
+        """残局求解或开局库给出的建议，都不适用时返回空列表
+        
+        lead_options 为已算好的先手启发式候选，先手时附在分析结果之后；
+        deadline 到达时放弃残局求解。
+        """
+        # 手牌较少时优先使用残局精确求解
+        if self.current_turn == "me" and 0 < self.state.hand_size <= self.endgame_threshold:
+            endgame = self._endgame_play(deadline)
+            if endgame:
+                if not self.current_round_cards:
+                    # 先手时保留其他可选策略
+                    if lead_options is None:
+                        lead_options = self._lead_play()
+                    endgame += [option for option in lead_options
+                                if option["cards"] != endgame[0]["cards"]]
+                return endgame
+        
+        # 每手牌的第一次先手出牌查询开局库
+        if (not self.current_round_cards and self.current_turn == "me"
+                and self.round_count == 0 and not self.played_cards):
+            opening = self._opening_play()
+            if opening:
+                if lead_options is None:
+                    lead_options = self._lead_play()
+                opening += [option for option in lead_options
+                            if option["cards"] != opening[0]["cards"]]
+                return opening
+        return []
+    
+    def _heuristic_suggestion(self):
+        """启发式建议（不做搜索，耗时很短）"""
         # 根据游戏状态选择策略
         if not self.current_round_cards and self.current_turn == "me":
             return self._lead_play()  # 先手出牌 - 返回多种选择
@@ -95,55 +481,206 @@ class GuandanAI:
         """先手出牌策略 - 返回多种选择"""
         options = []
         
+        moves = self._moves()
+        
         # 选项1: 单张
-        if self.hand_cards:
+        min_single = moves.single()
+        if min_single:
             options.append({
-                "cards": [self.hand_cards[0]],
+                "cards": min_single,
                 "type": "single",
                 "description": "出最小单张"
             })
         
         # 选项2: 对子
-        pairs = self._find_pairs()
-        if pairs:
-            min_pair = min(pairs, key=lambda p: max(self.card_value(card) for card in p))
+        min_pair = moves.pair()
+        if min_pair:
             options.append({
                 "cards": min_pair,
                 "type": "pair",
                 "description": "出最小对子"
             })
         
+        # 选项2b: 三带二（带代价最小的对子），没有可带的对子时出三张
+        min_full_house = moves.full_house()
+        min_triple = moves.triple()
+        if min_full_house:
+            options.append({
+                "cards": min_full_house,
+                "type": "full_house",
+                "description": "出最小三带二"
+            })
+        elif min_triple:
+            options.append({
+                "cards": min_triple,
+                "type": "triple",
+                "description": "出最小三张"
+            })
+        
         # 选项3: 顺子
-        sequences = self._find_sequences()
-        if sequences:
-            min_sequence = min(sequences, key=lambda s: max(self.card_value(card) for card in s))
+        # 连续牌型按代价顺序生成，只取第一个
+        min_sequence = next(moves.iter_runs("sequence"), None)
+        if min_sequence:
             options.append({
                 "cards": min_sequence,
                 "type": "sequence",
                 "description": f"出{len(min_sequence)}张顺子"
             })
         
-        # 选项4: 炸弹（如果有）
-        bombs = self._find_bombs()
-        if bombs and len(self.hand_cards) > 8:  # 手牌多时才考虑出炸弹
-            min_bomb = min(bombs, key=lambda b: max(self.card_value(card) for card in b))
+        # 选项3b: 木板和钢板
+        for run_type, run_name in (("pair_sequence", "木板"), ("triple_sequence", "钢板")):
+            min_run = next(moves.iter_runs(run_type), None)
+            if min_run:
+                options.append({
+                    "cards": min_run,
+                    "type": run_type,
+                    "description": f"出{run_name}"
+                })
+        
+        # 选项4: 炸弹或同花顺（如果有）
+        min_bomb = moves.bomb()
+        if min_bomb and self.state.hand_size > 8:  # 手牌多时才考虑出炸弹
+            bomb_type = self._identify_card_type(min_bomb)["type"]
             options.append({
                 "cards": min_bomb,
-                "type": "bomb",
-                "description": f"出{len(min_bomb)}张炸弹"
+                "type": bomb_type,
+                "description": "出同花顺" if bomb_type == "straight_flush" else f"出{len(min_bomb)}张炸弹"
             })
         
-        # 选项5: 随机策略
+        # 不同选项可能是同一手牌（如三带二没有可带的对子时），只保留第一个
+        offered = set()
+        unique = []
+        for option in options:
+            key = tuple(sorted(option["cards"]))
+            if key not in offered:
+                offered.add(key)
+                unique.append(option)
+        options = unique
+        
+        # 选项5: 随机策略（从代价较小的出牌中随机选一个上面没有的）
         if len(options) > 1:
-            random_option = random.choice(options)
-            options.append({
-                "cards": random_option["cards"],
-                "type": random_option["type"],
-                "description": "随机策略"
-            })
-        
+            others = [cards for _, cards in islice(moves.iter_moves(), RANDOM_CANDIDATES)
+                      if tuple(sorted(cards)) not in offered]
+            if others:
+                cards = self.rng.choice(others)
+                options.append({
+                    "cards": cards,
+                    "type": self._identify_card_type(cards)["type"],
+                    "description": "随机策略"
+                })
+        
+        return self._rank_options(options)
+    
+    def _rank_options(self, options):
+        """按出牌后剩余手牌的强度从高到低排序候选，有策略网络时再按其分数排序"""
+        for option in options:
+            option["score"] = round(self._residual_score(option["cards"]), 1)
+        options.sort(key=lambda option: -option["score"])
+        if self.policy is not None and len(options) > 1:
+            self.policy.rank(self, options)  # 稳定排序，策略分数相同时保持强度顺序
         return options
     
+    def _residual_score(self, cards):
+        """出掉 cards 后剩余手牌的强度得分"""
+        return self.evaluator.score(self._residual_counts(cards))
+    
+    def _residual_counts(self, cards):
+        """出掉 cards 后剩余手牌的牌值张数元组"""
+        counts = list(self.state.rank_counts)
+        for card in cards:
+            value = self.card_value(card)
+            if value:
+                counts[value - 3] -= 1
+        return tuple(counts)
+    
+    def _endgame_play(self, deadline=None):
+        """残局精确求解，无法求解时返回None交给启发式策略"""
+        to_beat = None
+        if self.current_round_cards:
+            to_beat = self._card_type_to_move(self.opponent_card_type)
+            if to_beat is None:
+                return None  # 求解器不支持的牌型
+        
+        opp_values = [self.card_value(card) for card in self.opponent_hand_cards or []]
+        if self.state.extra or 0 in opp_values:
+            return None  # 存在无法识别的牌
+        my_counts = self.state.counts()
+        opp_counts = counts_from_values(opp_values) if opp_values else None
+        
+        result = self.endgame_solver.solve(my_counts, opp_counts, to_beat, deadline=deadline)
+        if result is None:
+            return None  # 超出节点预算
+        move, score = result
+        
+        if opp_counts is None:
+            # 对手手牌未知：分数表示我方最少几手出完
+            turns = (WIN_SCORE - score + 1) // 2
+            description = f"残局最优: {turns}手出完"
+        else:
+            description = "残局必胜" if score > 0 else "残局必败"
+        
+        if move is None:
+            return [{"cards": [], "type": "pass", "description": f"{description}，建议不出"}]
+        cards = self._cards_for_move(move)
+        return [{
+            "cards": cards,
+            "type": self._identify_card_type(cards)["type"],  # 求解器不区分花色，顺子可能正是同花顺
+            "description": description
+        }]
+    
+    def _opening_play(self):
+        """从开局库查询推荐首攻，未收录时返回None"""
+        counts = self.state.counts()
+        if self.state.extra or not any(counts) or max(counts) > 8:
+            return None
+        move = self.opening_book.lookup(counts)
+        if move is None:
+            return None
+        cards = self._cards_for_move(move)
+        return [{
+            "cards": cards,
+            "type": self._identify_card_type(cards)["type"],
+            "description": "开局库推荐"
+        }]
+    
+    def _card_type_to_move(self, card_type):
+        """把牌型信息转换为求解器的出牌表示"""
+        if not card_type:
+            return None
+        if card_type["type"] in ("single", "pair", "triple"):
+            return (card_type["type"], card_type["value"], 1)
+        elif card_type["type"] == "full_house":
+            return ("full_house", card_type["value"], card_type["attach"])
+        elif card_type["type"] in ("sequence", "pair_sequence", "triple_sequence"):
+            return (card_type["type"], card_type["max"], card_type["length"])
+        elif card_type["type"] == "bomb":
+            return ("bomb", card_type["value"], card_type["size"])
+        elif card_type["type"] == "straight_flush":
+            return ("straight_flush", card_type["max"], 5)
+        return None
+    
+    def _cards_for_move(self, move):
+        """从手牌中取出求解器出牌对应的具体牌（按出牌索引的顺序，尽量不拆同花顺）"""
+        kind, value, length = move
+        rank_cards = self._moves().rank_cards
+        value_cards = {rank + 3: cards for rank, cards in enumerate(rank_cards)}
+        
+        if kind in SET_SIZES:
+            return value_cards[value][:SET_SIZES[kind]]
+        elif kind == "full_house":
+            return value_cards[value][:3] + value_cards[length][:2]
+        elif kind == "bomb":
+            return value_cards[value][:length]
+        elif kind == "straight_flush":
+            moves = self._moves()
+            strength = bomb_strength(kind, value, length)
+            for bomb_kind, bomb_power, cards in zip(moves.bomb_kinds, moves.bomb_strengths, moves.bombs):
+                if bomb_kind == kind and bomb_power == strength:
+                    return list(cards)
+            return []
+        width = RUN_SHAPES[kind][0]
+        return [card for v in range(value - length + 1, value + 1) for card in value_cards[v][:width]]
+    
     def _counter_play(self):
         """应对出牌策略：考虑牌型匹配"""
         if not self.current_round_cards or not self.opponent_card_type:
@@ -154,9 +691,13 @@ class GuandanAI:
             cards = self._counter_single()
         elif self.opponent_card_type["type"] == "pair":
             cards = self._counter_pair()
+        elif self.opponent_card_type["type"] in ("triple", "full_house"):
+            cards = self._counter_triple()
         elif self.opponent_card_type["type"] == "sequence":
             cards = self._counter_sequence()
-        elif self.opponent_card_type["type"] == "bomb":
+        elif self.opponent_card_type["type"] in ("pair_sequence", "triple_sequence"):
+            cards = self._counter_run()
+        elif self.opponent_card_type["type"] in ("bomb", "straight_flush"):
             cards = self._counter_bomb()
         else:
             cards = []
@@ -170,98 +711,71 @@ class GuandanAI:
     
     def _counter_single(self):
         """应对单张牌"""
-        opponent_value = self.card_value(self.current_round_cards[0])
         # 找能压制的最小单张
-        playable_cards = [card for card in self.hand_cards 
-                         if self.card_value(card) > opponent_value]
-        
-        if playable_cards:
-            return [min(playable_cards, key=self.card_value)]
-        return []
+        return self._moves().single(above=self.opponent_card_type["value"])
     
     def _counter_pair(self):
         """应对对子"""
-        # 对手对子的值
-        opponent_value = self.card_value(self.current_round_cards[0])
-        
-        # 找出所有对子
-        pairs = self._find_pairs()
-        
-        # 找出能压制对手的对子
-        playable_pairs = []
-        for pair in pairs:
-            if self.card_value(pair[0]) > opponent_value:
-                playable_pairs.append(pair)
-        
-        if playable_pairs:
-            # 选择最小压制对子
-            return min(playable_pairs, key=lambda p: max(self.card_value(card) for card in p))
+        # 选择最小压制对子
+        pair = self._moves().pair(above=self.opponent_card_type["value"])
+        if pair:
+            return pair
         
         # 没有对子，找炸弹
-        bombs = self._find_bombs()
-        if bombs:
-            return bombs[0]
+        return self._moves().bomb()
+    
+    def _counter_triple(self):
+        """应对三张/三带二（比三张的牌值）"""
+        moves = self._moves()
+        value = self.opponent_card_type["value"]
+        if self.opponent_card_type["type"] == "triple":
+            cards = moves.triple(above=value)
+        else:
+            cards = moves.full_house(above=value)
+        if cards:
+            return cards
         
-        return []
+        # 没有同型牌，找炸弹
+        return moves.bomb()
     
     def _counter_sequence(self):
         """应对顺子 - 修复版"""
-        # 对手顺子的长度和最大值
-        seq_length = len(self.current_round_cards)
-        opponent_max = max(self.card_value(card) for card in self.current_round_cards)
-        
-        # 找出所有顺子
-        sequences = self._find_sequences()
-        
-        # 找出能压制对手的顺子（相同长度且最大值更大）
-        playable_sequences = []
-        for seq in sequences:
-            if len(seq) == seq_length:
-                seq_max = max(self.card_value(card) for card in seq)
-                if seq_max > opponent_max:
-                    playable_sequences.append(seq)
-        
-        # 关键修复：如果没有相同长度的顺子，找更长的顺子
-        if not playable_sequences:
-            for seq in sequences:
-                if len(seq) > seq_length:  # 允许用更长的顺子压制
-                    playable_sequences.append(seq)
-        
-        if playable_sequences:
-            # 选择最小压制顺子（最小最大牌值）
-            return min(playable_sequences, key=lambda s: max(self.card_value(card) for card in s))
+        # 同长度更大的顺子，没有时允许用更长的顺子压制
+        sequence = self._moves().sequence(self.opponent_card_type["length"],
+                                          self.opponent_card_type["max"])
+        if sequence:
+            return sequence
         
         # 没有顺子，找炸弹
-        bombs = self._find_bombs()
-        if bombs:
-            return bombs[0]
-        
-        return []
+        return self._moves().bomb()
+    
+    def _counter_run(self):
+        """应对木板/钢板（需相同长度且最大牌值更大）"""
+        run = self._moves().run(self.opponent_card_type["type"],
+                                self.opponent_card_type["length"],
+                                self.opponent_card_type["max"])
+        if run:
+            return run
+        
+        # 没有同型连牌，找炸弹
+        return self._moves().bomb()
     
     def _counter_bomb(self):
-        """应对炸弹"""
-        # 对手炸弹的值
-        bomb_value = self.card_value(self.current_round_cards[0])
-        
-        # 找出所有炸弹
-        bombs = self._find_bombs()
-        
-        # 找出能压制对手的炸弹
-        playable_bombs = []
-        for bomb in bombs:
-            if self.card_value(bomb[0]) > bomb_value:
-                playable_bombs.append(bomb)
-        
-        if playable_bombs:
-            # 选择最小压制炸弹
-            return min(playable_bombs, key=lambda b: max(self.card_value(card) for card in b))
-        
-        # 没有炸弹，找更大的炸弹（如四张以上）
-        big_bombs = [bomb for bomb in bombs if len(bomb) > 4]
-        if big_bombs:
-            return big_bombs[0]
-        
-        return []
+        """应对炸弹（含同花顺）"""
+        # 取第一个能压制对手的炸弹（索引按大小排序）
+        return self._moves().bomb(above=self._bomb_strength(self.opponent_card_type))
+    
+    def _bomb_strength(self, card_type):
+        """炸弹类牌型的大小: 4张 < 5张 < 同花顺 < 6张 < ...，同级比牌值"""
+        if card_type["type"] == "straight_flush":
+            return bomb_strength("straight_flush", card_type["max"], 5)
+        return bomb_strength("bomb", card_type["value"], card_type["size"])
+    
+    def _moves(self):
+        """当前手牌的出牌索引，手牌变化后才重建"""
+        if self._move_index is None or self._move_index.key != self.state.hand.tobytes():
+            self._move_index = MoveIndex(self.state)
+        return self._move_index
     
     def _identify_card_type(self, cards):
         """识别牌型"""
@@ -278,6 +792,21 @@ class GuandanAI:
         if len(cards) == 2 and card_values[0] == card_values[1]:
             return {"type": "pair", "value": card_values[0]}
         
+        # 三张
+        if len(cards) == 3 and card_values[0] == card_values[2]:
+            return {"type": "triple", "value": card_values[0]}
+        
+        # 三带二（按三张的牌值比大小）
+        if len(cards) == 5 and card_values[0] == card_values[1] and card_values[3] == card_values[4] \
+                and card_values[1] != card_values[3] and card_values[2] in (card_values[1], card_values[3]):
+            attach = card_values[0] if card_values[2] == card_values[4] else card_values[4]
+            return {"type": "full_house", "value": card_values[2], "attach": attach}
+        
+        # 同花顺（5张同花色且连续）
+        if len(cards) == 5 and cards[0][:2] in SUITS and all(card[:2] == cards[0][:2] for card in cards):
+            if all(card_values[i] - card_values[i-1] == 1 for i in range(1, 5)):
+                return {"type": "straight_flush", "length": 5, "max": card_values[-1]}
+        
         # 顺子（5张或以上）
         if len(cards) >= 5:
             # 检查是否连续
@@ -290,6 +819,17 @@ class GuandanAI:
             if is_sequence:
                 return {"type": "sequence", "length": len(cards), "max": max(card_values)}
         
+        # 木板（3对或以上连对）和钢板（2个或以上连续三张）
+        unique_values = sorted(set(card_values))
+        is_consecutive = unique_values[-1] - unique_values[0] == len(unique_values) - 1
+        if is_consecutive and len(cards) >= 6:
+            if len(cards) == 2 * len(unique_values) and len(unique_values) >= 3 and \
+                    all(card_values.count(v) == 2 for v in unique_values):
+                return {"type": "pair_sequence", "length": len(unique_values), "max": unique_values[-1]}
+            if len(cards) == 3 * len(unique_values) and len(unique_values) >= 2 and \
+                    all(card_values.count(v) == 3 for v in unique_values):
+                return {"type": "triple_sequence", "length": len(unique_values), "max": unique_values[-1]}
+        
         # 炸弹（4张或以上相同值）
         if len(cards) >= 4:
             if all(v == card_values[0] for v in card_values):
@@ -300,49 +840,19 @@ class GuandanAI:
     
     def _find_pairs(self):
         """找出所有对子"""
-        value_count = defaultdict(list)
-        for card in self.hand_cards:
-            value = self.card_value(card)
-            value_count[value].append(card)
-        
-        # 返回所有对子（至少2张相同值）
-        return [cards[:2] for cards in value_count.values() if len(cards) >= 2]
+        return self._moves().pairs()
     
     def _find_sequences(self):
-        """找出所有顺子（5张或以上）- 修复版"""
-        if len(self.hand_cards) < 5:
-            return []
-        
-        # 按牌值排序
-        sorted_cards = sorted(self.hand_cards, key=self.card_value)
-        card_values = [self.card_value(card) for card in sorted_cards]
-        unique_values = sorted(set(card_values))
-        
-        sequences = []
-        
-        # 找出所有可能的顺子
-        for start in range(len(unique_values)):
-            for end in range(start + 5, len(unique_values) + 1):
-                # 检查是否连续
-                is_sequence = True
-                for i in range(start + 1, end):
-                    if unique_values[i] - unique_values[i-1] != 1:
-                        is_sequence = False
-                        break
-                
-                if is_sequence:
-                    # 提取连续牌
-                    seq_values = unique_values[start:end]
-                    seq_cards = []
-                    for val in seq_values:
-                        # 为每个值找一张牌
-                        for card in sorted_cards:
-                            if self.card_value(card) == val and card not in seq_cards:
-                                seq_cards.append(card)
-                                break
-                    sequences.append(seq_cards)
-        
-        return sequences
+        """找出所有顺子（5张或以上）"""
+        return self._moves().all_runs("sequence")
+    
+    def _find_pair_sequences(self):
+        """找出所有木板（3对或以上连对）"""
+        return self._moves().all_runs("pair_sequence")
+    
+    def _find_triple_sequences(self):
+        """找出所有钢板（2个或以上连续三张）"""
+        return self._moves().all_runs("triple_sequence")
     
     def _find_bombs(self):
         """找出炸弹（4张或以上相同值）"""
@@ -358,6 +868,15 @@ class GuandanAI:
         
         return bombs
     
+    def _find_straight_flushes(self):
+        """找出所有同花顺（基于花色位掩码的移位与运算）"""
+        return [[CARD_NAMES[(rank + k) * 4 + suit] for k in range(5)]
+                for suit, rank in self.state.straight_flushes()]
+    
+    def _find_bomb_moves(self):
+        """找出所有炸弹和同花顺，按从小到大排序"""
+        return [list(bomb) for bomb in self._moves().bombs]
+    
     @staticmethod
     def card_value(card):
         """计算牌面数值 - 修复版"""
@@ -376,7 +895,7 @@ class GuandanAI:
         """获取当前游戏状态摘要"""
         state = f"当前轮次: {self.round_count + 1}\n"
         state += f"当前出牌方: {'我方' if self.current_turn == 'me' else '对手'}\n"
-        state += f"剩余手牌: {len(self.hand_cards)}张\n"
+        state += f"剩余手牌: {self.state.hand_size}张\n"
         state += f"已出牌: {len(self.played_cards)}张\n"
         
         if self.current_round_cards:
@@ -392,26 +911,306 @@ class GuandanAI:
             return f"单张({card_type['value']})"
         elif card_type["type"] == "pair":
             return f"对子({card_type['value']})"
+        elif card_type["type"] == "triple":
+            return f"三张({card_type['value']})"
+        elif card_type["type"] == "full_house":
+            return f"三带二({card_type['value']})"
         elif card_type["type"] == "sequence":
             return f"{card_type['length']}张顺子(最大{card_type['max']})"
         elif card_type["type"] == "bomb":
             return f"{card_type['size']}张炸弹({card_type['value']})"
+        elif card_type["type"] == "straight_flush":
+            return f"同花顺(最大{card_type['max']})"
+        elif card_type["type"] == "pair_sequence":
+            return f"木板{card_type['length']}连对(最大{card_type['max']})"
+        elif card_type["type"] == "triple_sequence":
+            return f"钢板{card_type['length']}连三张(最大{card_type['max']})"
         elif card_type["type"] == "pass":
             return "不出"
         else:
             return f"其他牌型({card_type['size']}张)"
 
+# 进程池任务评估候选出牌使用的求解器（每个工作进程一份，工作进程逐个执行任务）
+_candidate_solver = None
+
+def _evaluate_candidate(rest_counts, opp_counts, move, node_budget, deadline, solver=None):
+    """评估一个候选出牌: 对手面对该出牌时的胜负，返回我方视角的分数
+    
+    正数为我方必胜，负数为必败，超出预算或截止时间返回None。
+    solver 为调用方AI自己的求解器（串行评估时传入），进程池任务使用本进程的候选求解器。
+    """
+    global _candidate_solver
+    if not any(rest_counts):
+        return WIN_SCORE  # 一手出完
+    if solver is None:
+        if _candidate_solver is None:
+            _candidate_solver = EndgameSolver()
+        solver = _candidate_solver
+    result = solver.solve(opp_counts, rest_counts, move, deadline=deadline, node_budget=node_budget)
+    if result is None:
+        return None
+    return -result[1]
+
+def _evaluate_shared(state_ref, move):
+    """按共享内存中的牌局评估候选出牌（进程池任务），槽位已被复用时返回None"""
+    state = read_state(*state_ref)
+    if state is None:
+        return None
+    my_counts, opp_counts, node_budget, deadline = state
+    return _evaluate_candidate(apply_move(my_counts, move), opp_counts, move, node_budget, deadline)
+
+# 批量建议使用的AI实例和结果缓存（每个进程一份，跨批次共享）
+_batch_ai = None
+_batch_cache = {}
+_BATCH_CACHE_LIMIT = 4096
+
+def _suggest_batch(states, search_workers=None):
+    """在当前进程中计算一批牌局状态的建议（search_workers 为搜索候选出牌的进程数）"""
+    global _batch_ai
+    if _batch_ai is None:
+        _batch_ai = GuandanAI(workers=search_workers)
+        # 进程退出前关闭搜索进程池：作为进程池的工作进程退出时会等待所有子进程结束；
+        # 优先级须高于进程池任务队列自身的清理（10），否则关闭信号发不出去
+        util.Finalize(_batch_ai, _batch_ai.close, exitpriority=20)
+    elif _batch_ai.workers != search_workers:
+        _batch_ai.close()  # 进程数变化，下次搜索时按新的进程数重建进程池
+        _batch_ai.workers = search_workers
+    results = []
+    for state in states:
+        hand = state.get("hand") or []
+        to_beat = state.get("to_beat") or []
+        seen = state.get("seen") or []
+        turn = state.get("turn", "me")
+        opponent = state.get("opponent")
+        time_limit = state.get("time_limit", _batch_ai.search_time)
+        # 计算时间上限也是键的一部分：时间不够时搜索会放弃，结果不能用于时间更充裕的请求
+        key = (tuple(sorted(hand)), tuple(sorted(to_beat)), tuple(sorted(seen)), turn,
+               None if opponent is None else tuple(sorted(opponent)), state.get("seed", 0), time_limit)
+        suggestions = _batch_cache.get(key)
+        if suggestions is None:
+            # 随机数按局面重新播种，结果与分批方式和工作进程无关
+            _batch_ai.rng.seed(repr(key))
+            _batch_ai.load_state(hand, to_beat, seen, turn)
+            if opponent is not None:
+                _batch_ai.record_opponent_hand(opponent)
+            suggestions = _batch_ai.suggest_play(force_recalculate=True,
+                                                 deadline=time.time() + time_limit)
+            if len(_batch_cache) >= _BATCH_CACHE_LIMIT:
+                _batch_cache.clear()
+            _batch_cache[key] = suggestions
+        # 返回副本，避免调用方修改缓存内容
+        results.append([dict(option) for option in suggestions])
+    return results
+
+def suggest_many(states, executor=None, workers=None, chunk_size=64, search_workers=None):
+    """批量生成出牌建议（无状态接口）
+    
+    states 为字典列表: {"hand": [...], "to_beat": [...], "seen": [...], "turn": "me"}，
+    可选 "opponent"（已知的对手手牌）、"time_limit"（该局面的计算时间上限，秒）
+    和 "seed"（随机种子，相同局面和种子的结果总是相同）；
+    可传入已有的进程池 executor，或用 workers 指定临时进程数；
+    search_workers 为对手手牌已知时每个局面并行搜索候选出牌的进程数（默认不并行）；
+    返回与 states 顺序一致的建议列表。
+    """
+    states = list(states)
+    if executor is None and (not workers or workers <= 1 or len(states) <= chunk_size):
+        return _suggest_batch(states, search_workers)
+    
+    chunks = [states[i:i + chunk_size] for i in range(0, len(states), chunk_size)]
+    suggest_chunk = partial(_suggest_batch, search_workers=search_workers)
+    if executor is not None:
+        chunk_results = executor.map(suggest_chunk, chunks)
+        return [result for chunk in chunk_results for result in chunk]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunk_results = pool.map(suggest_chunk, chunks)
+        return [result for chunk in chunk_results for result in chunk]
+
 # 增强的用户界面
+SUGGESTION_DEBOUNCE_MS = 50  # 牌局变化后等待多久（毫秒）没有新变化才计算建议
+
+# 后台逐步计算出牌建议的线程
+class SuggestionWorker(QThread):
+    suggestion_ready = pyqtSignal(int, object, bool)  # 请求编号, 候选列表, 是否为最终结果
+    
+    def __init__(self, request_id, progress, options):
+        super().__init__()
+        self.request_id = request_id
+        self.progress = progress  # suggest_progressive 生成器（第一个结果已取出）
+        self.options = options
+        self._cancelled = False
+    
+    def cancel(self):
+        """放弃本次计算（在下一个结果产出后停止）"""
+        self._cancelled = True
+    
+    def run(self):
+        for options in self.progress:
+            if self._cancelled:
+                break
+            self.options = options
+            self.suggestion_ready.emit(self.request_id, options, False)
+        self.progress.close()
+        if not self._cancelled:
+            self.suggestion_ready.emit(self.request_id, self.options, True)
+
+# 出牌历史日志文件（完整记录，历史面板只保留最近的若干条）
+DEFAULT_HISTORY_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "history.log")
+
+# 出牌历史面板：最近 limit 条保存在环形缓冲区中，同一轮事件循环内的追加合并为一次刷新，
+# 所有记录同时写入日志文件，更早的记录按需从日志读回
+class HistoryView(QPlainTextEdit):
+    def __init__(self, limit=500, log_path=DEFAULT_HISTORY_LOG, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.limit = limit
+        self.entries = deque(maxlen=limit)  # 显示中的最近记录: (日志偏移, 文本)
+        self._older = []    # 按需读回的更早记录，显示在最前面
+        self._pending = []  # 等待刷新到界面的记录
+        self._log = None
+        if log_path:
+            try:
+                self._log = open(log_path, "ab+")
+            except OSError:
+                self._log = None  # 日志不可写时只保留内存中的记录
+    
+    def append(self, text):
+        """追加一条记录（界面在本轮事件处理结束后统一刷新）"""
+        text = str(text).replace("\n", " ")
+        offset = None
+        if self._log is not None:
+            self._log.seek(0, os.SEEK_END)
+            offset = self._log.tell()
+            self._log.write(text.encode("utf-8") + b"\n")
+        if not self._pending:
+            QTimer.singleShot(0, self.flush)
+        self._pending.append((offset, text))
+    
+    def flush(self):
+        """把积累的记录一次性追加到界面，超出上限的旧记录从顶部移除"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        if self._log is not None:
+            self._log.flush()
+        self.entries.extend(pending)
+        if self._older or len(pending) >= self.limit:
+            self._older = []  # 有新记录时收起之前读回的旧记录
+            self._render()
+            return
+        self.appendPlainText("\n".join(text for _, text in pending))
+        excess = self.blockCount() - len(self.entries)
+        if excess > 0:
+            cursor = QTextCursor(self.document())
+            cursor.movePosition(QTextCursor.Start)
+            cursor.movePosition(QTextCursor.NextBlock, QTextCursor.KeepAnchor, excess)
+            cursor.removeSelectedText()
+    
+    def _render(self):
+        """按缓冲区内容重建显示"""
+        self.setPlainText("\n".join(text for _, text in self._older + list(self.entries)))
+        self.moveCursor(QTextCursor.End)
+    
+    def clear(self):
+        """清空面板（日志文件保留）"""
+        self._pending = []
+        self._older = []
+        self.entries.clear()
+        super().clear()
+    
+    def load_older(self, count=200):
+        """从日志读回当前显示之前的 count 条记录，返回读回的条数"""
+        self.flush()
+        first = self._older or self.entries
+        if self._log is None or not first or first[0][0] is None:
+            return 0
+        older = self._read_before(first[0][0], count)
+        if older:
+            self._older = older + self._older
+            self._render()
+            self.moveCursor(QTextCursor.Start)
+        return len(older)
+    
+    def _read_before(self, end, count):
+        """从日志偏移 end 往前读取最多 count 行，返回 (偏移, 文本) 列表"""
+        data = b""
+        start = end
+        while start > 0 and data.count(b"\n") <= count:
+            start = max(0, start - 8192)
+            self._log.seek(start)
+            data = self._log.read(end - start)
+        lines = data.split(b"\n")[:-1]
+        offsets = []
+        offset = end
+        for line in reversed(lines):
+            offset -= len(line) + 1
+            offsets.append(offset)
+        offsets.reverse()
+        if start > 0:
+            # 第一行可能不完整
+            lines, offsets = lines[1:], offsets[1:]
+        entries = [(offset, line.decode("utf-8", "replace")) for offset, line in zip(offsets, lines)]
+        return entries[-count:]
+    
+    def close_log(self):
+        if self._log is not None:
+            self.flush()
+            self._log.close()
+            self._log = None
+
+# 手牌列表模型：手牌变化时只插入/删除变化的行，未变化的行保持选中状态
+class HandListModel(QAbstractListModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._cards = []
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._cards)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role == Qt.DisplayRole:
+            return self._cards[index.row()]
+        return None
+    
+    def card(self, row):
+        return self._cards[row]
+    
+    def set_cards(self, cards):
+        """按新旧手牌的差异增量更新（从后往前处理，前面的行号不受影响）"""
+        opcodes = SequenceMatcher(None, self._cards, cards, autojunk=False).get_opcodes()
+        for tag, i1, i2, j1, j2 in reversed(opcodes):
+            if tag in ("replace", "delete"):
+                self.beginRemoveRows(QModelIndex(), i1, i2 - 1)
+                del self._cards[i1:i2]
+                self.endRemoveRows()
+            if tag in ("replace", "insert"):
+                self.beginInsertRows(QModelIndex(), i1, i1 + j2 - j1 - 1)
+                self._cards[i1:i1] = cards[j1:j2]
+                self.endInsertRows()
+
 class GuandanAssistant(QMainWindow):
-    def __init__(self):
+    def __init__(self, seed=None, history_log=DEFAULT_HISTORY_LOG, memory_monitor=None, workers=None):
         super().__init__()
         self.setWindowTitle("掼蛋辅助机器人 - 多策略版")
         self.setGeometry(100, 100, 900, 700)
         
-        # 初始化AI和识别器
-        self.ai = GuandanAI()
-        self.recognizer = CardRecognizer()
+        # 初始化AI和识别器，随机数都由会话种子派生，记录种子即可复现
+        self.session_seed = seed if seed is not None else random.randrange(1 << 32)
+        session_rng = random.Random(self.session_seed)
+        self.ai = GuandanAI(rng=random.Random(session_rng.getrandbits(64)), seed=self.session_seed,
+                            workers=workers)  # workers: 对手手牌已知时并行搜索候选的进程数
+        self.recognizer = CardRecognizer(rng=random.Random(session_rng.getrandbits(64)))
         self.last_suggestion_time = None
+        self.suggestion_request = 0  # 最新一次建议请求的编号，旧请求的结果直接丢弃
+        self.suggestion_workers = set()
+        self.suggested_state = None  # 最近一次计算建议时的牌局版本
+        self.force_suggestion = False
+        self.memory_monitor = memory_monitor  # 内存诊断模式下每局报告内存增长（GuandanMemory.MemoryMonitor）
+        self.game_count = 1
+        # 连续的牌局变化合并为一次计算：最后一次变化后等待片刻再计算
+        self.suggestion_timer = QTimer(self)
+        self.suggestion_timer.setSingleShot(True)
+        self.suggestion_timer.setInterval(SUGGESTION_DEBOUNCE_MS)
+        self.suggestion_timer.timeout.connect(self.compute_suggestion)
         
         # 创建主窗口和布局
         central_widget = QWidget()
@@ -437,6 +1236,24 @@ class GuandanAssistant(QMainWindow):
         self.camera_btn.setStyleSheet("font-size: 14px; height: 40px; background-color: #2196F3; color: white;")
         control_layout.addWidget(self.camera_btn)
         
+        # 撤销/重做按钮
+        undo_layout = QHBoxLayout()
+        undo_layout.setSpacing(5)
+        
+        self.undo_btn = QPushButton("↩️ 撤销")
+        self.undo_btn.setShortcut(QKeySequence.Undo)
+        self.undo_btn.clicked.connect(self.undo_action)
+        self.undo_btn.setStyleSheet("font-size: 14px; height: 35px; background-color: #607D8B; color: white;")
+        undo_layout.addWidget(self.undo_btn)
+        
+        self.redo_btn = QPushButton("↪️ 重做")
+        self.redo_btn.setShortcut(QKeySequence.Redo)
+        self.redo_btn.clicked.connect(self.redo_action)
+        self.redo_btn.setStyleSheet("font-size: 14px; height: 35px; background-color: #607D8B; color: white;")
+        undo_layout.addWidget(self.redo_btn)
+        
+        control_layout.addLayout(undo_layout)
+        
         left_panel.addWidget(control_group)
         
         # 手牌显示区
@@ -444,10 +1261,14 @@ class GuandanAssistant(QMainWindow):
         hand_layout = QVBoxLayout(hand_group)
         hand_layout.setSpacing(10)
         
-        self.hand_list = QListWidget()
-        self.hand_list.setSelectionMode(QListWidget.MultiSelection)
+        self.hand_model = HandListModel(self)
+        self.hand_list = QListView()
+        self.hand_list.setModel(self.hand_model)
+        self.hand_list.setSelectionMode(QListView.MultiSelection)
+        self.hand_list.setUniformItemSizes(True)
         self.hand_list.setStyleSheet("font-size: 14px; min-height: 200px;")
         hand_layout.addWidget(self.hand_list)
+        self.ai.add_hand_listener(self.hand_model.set_cards)
         
         # 操作按钮布局
         button_layout = QHBoxLayout()
@@ -492,6 +1313,17 @@ class GuandanAssistant(QMainWindow):
         self.opponent_type_label.setStyleSheet("font-size: 14px; color: #D32F2F; font-weight: bold; padding: 5px;")
         opponent_layout.addWidget(self.opponent_type_label)
         
+        # 已知对手剩余手牌时输入，建议会按搜索结果排序
+        self.opponent_hand_input = QLineEdit()
+        self.opponent_hand_input.setPlaceholderText("已知的对手剩余手牌（可选），留空表示未知")
+        self.opponent_hand_input.setStyleSheet("font-size: 14px; padding: 8px;")
+        opponent_layout.addWidget(self.opponent_hand_input)
+        
+        self.opponent_hand_btn = QPushButton("🃏 设置对手手牌")
+        self.opponent_hand_btn.clicked.connect(self.set_opponent_hand)
+        self.opponent_hand_btn.setStyleSheet("font-size: 14px; height: 35px; background-color: #795548; color: white;")
+        opponent_layout.addWidget(self.opponent_hand_btn)
+        
         left_panel.addWidget(opponent_group)
         
         # 右侧面板 - 游戏状态和建议
@@ -518,6 +1350,7 @@ class GuandanAssistant(QMainWindow):
         self.strategy_buttons_container = QWidget()
         self.strategy_buttons_layout = QHBoxLayout(self.strategy_buttons_container)
         self.strategy_buttons_layout.setContentsMargins(0, 0, 0, 0)
+        self.strategy_buttons = []  # 复用的策略按钮（多余的隐藏而不销毁）
         suggestion_layout.addWidget(self.strategy_buttons_container)
         
         # 建议信息头
@@ -547,7 +1380,7 @@ class GuandanAssistant(QMainWindow):
         suggestion_buttons.addWidget(self.play_suggestion_btn)
         
         self.refresh_suggestion_btn = QPushButton("🔄 更新建议")
-        self.refresh_suggestion_btn.clicked.connect(self.update_suggestion)
+        self.refresh_suggestion_btn.clicked.connect(lambda: self.update_suggestion(force=True))
         self.refresh_suggestion_btn.setStyleSheet("font-size: 14px; height: 35px; background-color: #FFC107; color: black;")
         suggestion_buttons.addWidget(self.refresh_suggestion_btn)
         
@@ -569,11 +1402,14 @@ class GuandanAssistant(QMainWindow):
         history_group = QGroupBox("📜 出牌历史")
         history_layout = QVBoxLayout(history_group)
         
-        self.history_display = QTextEdit()
-        self.history_display.setReadOnly(True)
+        self.history_display = HistoryView(log_path=history_log)
         self.history_display.setStyleSheet("font-size: 14px; background-color: #FFF8E1; min-height: 150px;")
         history_layout.addWidget(self.history_display)
         
+        self.older_history_btn = QPushButton("⏫ 加载更早记录")
+        self.older_history_btn.clicked.connect(self.load_older_history)
+        history_layout.addWidget(self.older_history_btn)
+        
         right_panel.addWidget(history_group)
         
         # 组合布局
@@ -585,14 +1421,24 @@ class GuandanAssistant(QMainWindow):
         
         # 设置初始大小
         self.setMinimumSize(900, 650)
+        self.history_display.append(f"会话随机种子: {self.session_seed}")
     
     def reset_game(self):
         """重置游戏"""
+        self.start_new_game()
+        QMessageBox.information(self, "新游戏", "已开始新游戏，请扫描手牌")
+    
+    def start_new_game(self):
+        """清空牌局和界面，开始新的一局"""
+        if self.memory_monitor is not None:
+            self.memory_monitor.checkpoint(f"第{self.game_count}局结束")
+        self.game_count += 1
         self.ai.reset_game()
-        self.hand_list.clear()
         self.opponent_input.clear()
+        self.opponent_hand_input.clear()
         self.suggestion_list.clear()
         self.history_display.clear()
+        self.history_display.append(f"会话随机种子: {self.session_seed}")
         self.opponent_type_label.setText("对手牌型: 未记录")
         self.suggestion_time_label.setText("")
         self.suggestion_type_label.setText("建议牌型: 无")
@@ -603,16 +1449,57 @@ class GuandanAssistant(QMainWindow):
         self.update_game_display()
         self.update_suggestion()
         self.statusBar().showMessage("新游戏已开始，请扫描手牌")
-        QMessageBox.information(self, "新游戏", "已开始新游戏，请扫描手牌")
     
     def clear_strategy_buttons(self):
-        """清除所有策略按钮"""
-        # 移除所有策略按钮
-        while self.strategy_buttons_layout.count():
-            item = self.strategy_buttons_layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
+        """隐藏所有策略按钮（按钮保留在池中供下次复用）"""
+        self.set_strategy_buttons([])
+    
+    def set_strategy_buttons(self, suggestions):
+        """按候选列表更新策略按钮，只改动内容有变化的按钮"""
+        self.strategy_buttons_container.setUpdatesEnabled(False)
+        try:
+            while len(self.strategy_buttons) < len(suggestions):
+                self.strategy_buttons.append(self._create_strategy_button())
+            for i, button in enumerate(self.strategy_buttons):
+                if i >= len(suggestions):
+                    if not button.isHidden():
+                        button.hide()
+                    continue
+                text = f"策略{i+1}: {suggestions[i]['description']}"
+                if button.text() != text:
+                    button.setText(text)
+                if button.property("suggestion") != suggestions[i]["cards"]:
+                    button.setProperty("suggestion", suggestions[i]["cards"])
+                if button.isHidden():
+                    button.show()
+        finally:
+            self.strategy_buttons_container.setUpdatesEnabled(True)
+    
+    def _create_strategy_button(self):
+        """创建一个策略按钮并加入布局（只在池中按钮不够时调用）"""
+        strategy_btn = QPushButton()
+        strategy_btn.clicked.connect(self.select_strategy)
+        strategy_btn.setStyleSheet("""
+            QPushButton {
+                font-size: 12px;
+                padding: 5px;
+                background-color: #E1BEE7;
+                border: 1px solid #7B1FA2;
+            }
+            QPushButton:hover {
+                background-color: #CE93D8;
+            }
+        """)
+        strategy_btn.hide()
+        self.strategy_buttons_layout.addWidget(strategy_btn)
+        return strategy_btn
+    
+    def show_suggestion_cards(self, cards):
+        """在建议列表中显示一组牌，内容未变时不重建"""
+        current = [self.suggestion_list.item(i).text() for i in range(self.suggestion_list.count())]
+        if current != list(cards):
+            self.suggestion_list.clear()
+            self.suggestion_list.addItems(cards)
     
     def capture_cards(self):
         """模拟拍照识别过程"""
@@ -622,13 +1509,14 @@ class GuandanAssistant(QMainWindow):
         
         if file_name:
             # 识别卡片
-            cards = self.recognizer.recognize_cards(file_name)
-            self.hand_list.clear()
-            self.hand_list.addItems(cards)
-            self.ai.update_hand(cards)
-            self.update_game_display()
-            self.update_suggestion()
-            self.statusBar().showMessage(f"已扫描手牌: {len(cards)}张", 3000)
+            self.load_hand(self.recognizer.recognize_cards(file_name))
+    
+    def load_hand(self, cards):
+        """设置手牌并刷新建议"""
+        self.ai.update_hand(cards)
+        self.update_game_display()
+        self.update_suggestion()
+        self.statusBar().showMessage(f"已扫描手牌: {len(cards)}张", 3000)
     
     def record_opponent_play(self):
         """记录对手出牌"""
@@ -661,22 +1549,34 @@ class GuandanAssistant(QMainWindow):
         )
         self.statusBar().showMessage(f"已记录对手出牌: {len(opponent_cards)}张", 3000)
     
+    def set_opponent_hand(self):
+        """设置已知的对手剩余手牌（留空表示未知）"""
+        cards = self.opponent_hand_input.text().split()
+        for card in cards:
+            if len(card) < 3:
+                QMessageBox.warning(self, "输入错误", f"无效的牌: {card}")
+                return
+        
+        self.ai.record_opponent_hand(cards or None)
+        self.update_suggestion()
+        if cards:
+            self.history_display.append(f"对手剩余手牌: {' '.join(cards)}")
+            self.statusBar().showMessage(f"已设置对手手牌: {len(cards)}张", 3000)
+        else:
+            self.statusBar().showMessage("已清除对手手牌", 3000)
+    
     def play_selected_cards(self):
         """出选中的牌"""
-        selected_items = self.hand_list.selectedItems()
-        if not selected_items:
+        cards = self.selected_hand_cards()
+        if not cards:
             QMessageBox.warning(self, "出牌错误", "请选择要出的牌")
             return
         
-        cards = [item.text() for item in selected_items]
-        self.ai.record_my_play(cards)
-        
-        # 从手牌列表移除
-        for item in selected_items:
-            self.hand_list.takeItem(self.hand_list.row(item))
-        
-        # 关键修复：重置当前轮次状态
-        self.ai.reset_round()
+        # 出牌和重置轮次合并为一次可撤销的操作
+        with self.ai.action():
+            self.ai.record_my_play(cards)
+            # 关键修复：重置当前轮次状态
+            self.ai.reset_round()
         
         # 添加到历史记录
         card_type = self.ai._identify_card_type(cards)
@@ -691,12 +1591,11 @@ class GuandanAssistant(QMainWindow):
     
     def identify_selected_cards(self):
         """识别选中牌的牌型"""
-        selected_items = self.hand_list.selectedItems()
-        if not selected_items:
+        cards = self.selected_hand_cards()
+        if not cards:
             QMessageBox.warning(self, "操作错误", "请选择要识别的牌")
             return
         
-        cards = [item.text() for item in selected_items]
         card_type = self.ai._identify_card_type(cards)
         
         QMessageBox.information(
@@ -709,8 +1608,14 @@ class GuandanAssistant(QMainWindow):
     
     def pass_turn(self):
         """跳过当前回合"""
-        self.ai.record_my_play([])
-        self.ai.reset_round()
+        self.skip_turn()
+        QMessageBox.information(self, "跳过回合", "您选择了跳过当前回合")
+    
+    def skip_turn(self):
+        """记录我方不出并刷新界面"""
+        with self.ai.action():
+            self.ai.record_my_play([])
+            self.ai.reset_round()
         
         # 添加到历史记录
         self.history_display.append(f"第{self.ai.round_count}轮 - 我方跳过")
@@ -718,10 +1623,38 @@ class GuandanAssistant(QMainWindow):
         self.update_game_display()
         self.update_suggestion()
         self.statusBar().showMessage("已跳过当前回合", 3000)
-        QMessageBox.information(self, "跳过回合", "您选择了跳过当前回合")
+    
+    def undo_action(self):
+        """撤销上一步操作"""
+        if not self.ai.undo():
+            self.statusBar().showMessage("没有可撤销的操作", 3000)
+            return
+        self.refresh_after_undo("已撤销上一步操作")
+    
+    def redo_action(self):
+        """重做上一步撤销的操作"""
+        if not self.ai.redo():
+            self.statusBar().showMessage("没有可重做的操作", 3000)
+            return
+        self.refresh_after_undo("已重做上一步操作")
+    
+    def refresh_after_undo(self, message):
+        """撤销/重做后刷新界面（手牌列表由引擎的手牌变化通知更新）"""
+        if self.ai.opponent_card_type:
+            self.opponent_type_label.setText(
+                f"对手牌型: {self.ai._format_card_type(self.ai.opponent_card_type)}"
+            )
+        else:
+            self.opponent_type_label.setText("对手牌型: 未记录")
+        
+        self.history_display.append(f"第{self.ai.round_count+1}轮 - {message}")
+        self.update_game_display()
+        self.update_suggestion()
+        self.statusBar().showMessage(message, 3000)
     
     def play_suggested_cards(self):
         """采用AI建议出牌"""
+        self.flush_suggestion()
         if self.suggestion_list.count() == 0:
             QMessageBox.warning(self, "出牌错误", "没有可用的出牌建议")
             return
@@ -732,17 +1665,61 @@ class GuandanAssistant(QMainWindow):
             suggested_cards.append(self.suggestion_list.item(i).text())
         
         # 从手牌列表中选中建议的牌
-        self.hand_list.clearSelection()
-        for i in range(self.hand_list.count()):
-            item = self.hand_list.item(i)
-            if item.text() in suggested_cards:
-                item.setSelected(True)
+        self.select_hand_cards(suggested_cards)
         
         # 自动出牌
         self.play_selected_cards()
     
-    def update_suggestion(self):
-        """更新出牌建议 - 支持多策略"""
+    def selected_hand_cards(self):
+        """手牌列表中选中的牌（按列表顺序）"""
+        rows = sorted(index.row() for index in self.hand_list.selectionModel().selectedIndexes())
+        return [self.hand_model.card(row) for row in rows]
+    
+    def select_hand_cards(self, cards):
+        """在手牌列表中选中指定的牌（同名牌按张数选中）"""
+        wanted = Counter(cards)
+        selection = QItemSelection()
+        for row in range(self.hand_model.rowCount()):
+            card = self.hand_model.card(row)
+            if wanted[card] > 0:
+                wanted[card] -= 1
+                index = self.hand_model.index(row)
+                selection.select(index, index)
+        self.hand_list.selectionModel().select(selection, QItemSelectionModel.ClearAndSelect)
+    
+    def update_suggestion(self, force=False):
+        """牌局变化后请求更新建议
+        
+        短时间内的多次请求合并为一次计算，牌局未变时不重复计算；
+        force 为 True 时即使牌局未变也重新计算（手动刷新）。
+        """
+        self.force_suggestion = self.force_suggestion or force
+        self.refresh_suggestion_btn.setText("🔄 计算中...")
+        self.suggestion_timer.start()
+    
+    def flush_suggestion(self):
+        """立即执行尚在等待中的建议计算（采用建议出牌前调用）"""
+        if self.suggestion_timer.isActive():
+            self.suggestion_timer.stop()
+            self.compute_suggestion()
+    
+    def compute_suggestion(self):
+        """计算出牌建议 - 先立即显示启发式建议，更深入的分析在后台完成后逐步刷新"""
+        state_key = self.ai.state_key()
+        force, self.force_suggestion = self.force_suggestion, False
+        if not force and state_key == self.suggested_state:
+            # 牌局与上次计算时相同，沿用当前建议（后台分析仍在进行时继续等待其结果）
+            if not any(worker.request_id == self.suggestion_request and worker.isRunning()
+                       for worker in self.suggestion_workers):
+                self.refresh_suggestion_btn.setText("🔄 更新建议")
+            return
+        self.suggested_state = state_key
+        
+        # 取消尚未完成的旧请求
+        self.suggestion_request += 1
+        for worker in self.suggestion_workers:
+            worker.cancel()
+        
         # 记录更新时间
         update_time = datetime.now().strftime("%H:%M:%S")
         self.suggestion_time_label.setText(f"更新时间: {update_time}")
@@ -753,49 +1730,59 @@ class GuandanAssistant(QMainWindow):
             self.suggestion_label.setText("建议出牌: 请先扫描手牌")
             self.suggestion_type_label.setText("建议牌型: 无")
             self.clear_strategy_buttons()
+            self.refresh_suggestion_btn.setText("🔄 更新建议")
             self.statusBar().showMessage("无法更新建议: 无手牌数据", 3000)
             return
         
-        # 添加视觉反馈动画
-        self.refresh_suggestion_btn.setText("🔄 计算中...")
-        QApplication.processEvents()  # 立即更新UI
-        
-        # 强制重新计算建议
-        suggestions = self.ai.suggest_play(force_recalculate=True)
-        self.suggestion_list.clear()
-        self.clear_strategy_buttons()
+        # 在牌局副本上计算，界面继续操作不影响后台线程
+        progress = self.ai.fork().suggest_progressive()
+        suggestions = next(progress)
+        self.ai._last_suggestion = suggestions
+        self.show_suggestions(suggestions, False)
+        
+        worker = SuggestionWorker(self.suggestion_request, progress, suggestions)
+        worker.suggestion_ready.connect(self.on_suggestion_ready)
+        worker.finished.connect(self.on_suggestion_worker_finished)
+        self.suggestion_workers.add(worker)
+        worker.start()
+    
+    def on_suggestion_worker_finished(self):
+        """后台线程结束后释放（连接绑定方法而不是引用线程的lambda，否则线程对象永远不会被回收）"""
+        worker = self.sender()
+        if worker in self.suggestion_workers:
+            worker.wait()  # finished 信号送达时线程可能还没完全退出
+            self.suggestion_workers.discard(worker)
+    
+    def on_suggestion_ready(self, request_id, suggestions, final):
+        """后台线程产出更好的建议时原地刷新"""
+        if request_id != self.suggestion_request or self.ai.state_key() != self.suggested_state:
+            return  # 牌局已变化，丢弃过期结果
+        self.ai._last_suggestion = suggestions
+        self.show_suggestions(suggestions, final)
+    
+    def show_suggestions(self, suggestions, final):
+        """显示建议；final 为 False 时为中间结果，只刷新显示不写历史记录"""
+        update_time = datetime.now().strftime("%H:%M:%S")
+        self.set_strategy_buttons(suggestions)
         
-        # 0.3秒后恢复按钮文本
-        QTimer.singleShot(300, lambda: self.refresh_suggestion_btn.setText("🔄 更新建议"))
+        if final:
+            self.refresh_suggestion_btn.setText("🔄 更新建议")
         
         if suggestions:
             # 显示策略按钮
             self.suggestion_label.setText("可选策略:")
             
-            for i, option in enumerate(suggestions):
-                strategy_btn = QPushButton(f"策略{i+1}: {option['description']}")
-                strategy_btn.setProperty("suggestion", option["cards"])
-                strategy_btn.clicked.connect(self.select_strategy)
-                strategy_btn.setStyleSheet("""
-                    QPushButton {
-                        font-size: 12px;
-                        padding: 5px;
-                        background-color: #E1BEE7;
-                        border: 1px solid #7B1FA2;
-                    }
-                    QPushButton:hover {
-                        background-color: #CE93D8;
-                    }
-                """)
-                self.strategy_buttons_layout.addWidget(strategy_btn)
-            
             # 默认显示第一个策略的牌
+            self.show_suggestion_cards(suggestions[0]["cards"])
             if suggestions[0]["cards"]:
-                self.suggestion_list.addItems(suggestions[0]["cards"])
                 self.suggestion_type_label.setText(
                     f"策略牌型: {self.ai._format_card_type(self.ai._identify_card_type(suggestions[0]['cards']))}"
                 )
             
+            if not final:
+                self.statusBar().showMessage(f"分析中... | 已提供{len(suggestions)}种策略", 3000)
+                return
+            
             # 状态栏反馈
             self.statusBar().showMessage(f"建议已更新 | {update_time} | 提供{len(suggestions)}种策略", 3000)
             
@@ -805,6 +1792,7 @@ class GuandanAssistant(QMainWindow):
             )
         else:
             # 处理其他情况
+            self.show_suggestion_cards([])
             self.suggestion_label.setText("建议: 不出")
             self.suggestion_type_label.setText("建议牌型: 无")
             
@@ -816,6 +1804,8 @@ class GuandanAssistant(QMainWindow):
                 reason = "无法压制对手出牌"
             elif self.ai.current_turn == "opponent":
                 reason = "当前是对手回合"
+            if not final:
+                return
             
             # 状态栏反馈
             self.statusBar().showMessage(f"建议: 不出 | 原因: {reason}", 3000)
@@ -837,8 +1827,7 @@ class GuandanAssistant(QMainWindow):
             return
         
         # 在建议列表中显示这些牌
-        self.suggestion_list.clear()
-        self.suggestion_list.addItems(cards)
+        self.show_suggestion_cards(cards)
         
         # 显示牌型信息
         card_type = self.ai._identify_card_type(cards)
@@ -849,21 +1838,43 @@ class GuandanAssistant(QMainWindow):
         # 状态栏反馈
         self.statusBar().showMessage(f"已选择策略: {sender.text().split(':')[1].strip()}", 2000)
 
+    def load_older_history(self):
+        """从日志读回更早的出牌历史"""
+        count = self.history_display.load_older()
+        self.statusBar().showMessage(f"已加载{count}条更早记录" if count else "没有更早的记录", 3000)
+    
+    def closeEvent(self, event):
+        """关闭窗口时停止后台计算并释放AI的评估进程池"""
+        for worker in list(self.suggestion_workers):
+            worker.cancel()
+            worker.wait()
+        self.ai.close()
+        self.history_display.close_log()
+        super().closeEvent(event)
+    
     def update_game_display(self):
         """更新游戏状态显示"""
         state = self.ai.get_game_state()
         self.status_display.setText(state)
-        
-        # 更新手牌列表
-        if self.hand_list.count() == 0 and self.ai.hand_cards:
-            self.hand_list.addItems(self.ai.hand_cards)
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="掼蛋辅助机器人")
+    parser.add_argument("--seed", type=int, default=None, help="会话随机种子（用于复现）")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="内存诊断模式：每开始新的一局时用tracemalloc报告内存增长最多的代码位置（输出到标准错误）")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="对手手牌已知时并行搜索候选出牌的进程数（默认不并行）")
+    args, qt_args = parser.parse_known_args()
+    monitor = None
+    if args.trace_memory:
+        from GuandanMemory import MemoryMonitor
+        monitor = MemoryMonitor()
+        monitor.start()
+    app = QApplication(sys.argv[:1] + qt_args)
     
     # 设置应用样式
     app.setStyle("Fusion")
     
-    window = GuandanAssistant()
+    window = GuandanAssistant(seed=args.seed, memory_monitor=monitor, workers=args.workers)
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from GuandanAssistan4 import suggest_many
+
+# 掼蛋命令行批量分析（不需要图形界面）
+#
+# 从文件或标准输入逐行读取牌局，每行一个:
+#   JSON对象  {"id": "g1-5", "hand": ["红桃5", ...], "to_beat": [...], "seen": [...],
+#              "turn": "me", "opponent": [...], "time_limit": 0.5, "seed": 7}
+#   或纯文本  空格分隔的手牌（我方先手）
+# 按输入顺序向标准输出逐行写出JSON结果:
+#   {"id": "g1-5", "line": 1, "ok": true, "suggestions": [...]}
+# 多进程并行计算，读入和输出都是流式的，可处理任意大的对局存档。
+
+STATE_KEYS = ("hand", "to_beat", "seen", "turn", "opponent", "time_limit", "seed")
+CARD_LIST_KEYS = ("hand", "to_beat", "seen", "opponent")
+TURNS = ("me", "opponent")
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_cards(key, value):
+    """检查牌列表字段，不是牌名字符串列表时抛出ValueError"""
+    if not isinstance(value, list) or not all(isinstance(card, str) for card in value):
+        raise ValueError(f"{key} 必须是牌名字符串列表")
+
+
+def validate_state(state):
+    """检查牌局字段的类型，不合法时抛出ValueError"""
+    for key in CARD_LIST_KEYS:
+        value = state.get(key)
+        if value is None and key != "hand":
+            continue
+        validate_cards(key, value)
+    if not state["hand"]:
+        raise ValueError("缺少手牌")
+    if "turn" in state and state["turn"] not in TURNS:
+        raise ValueError(f"turn 必须是 {' 或 '.join(TURNS)}")
+    if "time_limit" in state and not (_is_number(state["time_limit"]) and state["time_limit"] >= 0):
+        raise ValueError("time_limit 必须是非负数")
+    if "seed" in state and not (isinstance(state["seed"], (int, str)) and not isinstance(state["seed"], bool)):
+        raise ValueError("seed 必须是整数或字符串")
+
+
+def parse_line(line, time_limit=None, seed=0):
+    """把一行输入解析为牌局状态字典，格式错误时抛出ValueError"""
+    if line.startswith("{"):
+        item = json.loads(line)
+        if not isinstance(item, dict):
+            raise ValueError("牌局必须是JSON对象")
+    else:
+        item = {"hand": line.split()}
+    if "hand" not in item:
+        raise ValueError("缺少手牌")
+    state = {key: item[key] for key in STATE_KEYS if key in item}
+    validate_state(state)
+    if time_limit is not None:
+        state.setdefault("time_limit", time_limit)
+    state.setdefault("seed", seed)
+    return item.get("id"), state
+
+
+def read_chunks(lines, chunk_size, time_limit=None, seed=0):
+    """把输入行分成若干批，每批为 (行号, 牌局ID, 状态或错误信息) 列表"""
+    chunk = []
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            item_id, state = parse_line(line, time_limit, seed)
+        except ValueError as exc:
+            chunk.append((line_no, None, str(exc)))
+        else:
+            chunk.append((line_no, item_id, state))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _analyze_chunk(chunk, search_workers=None):
+    """计算一批牌局的建议，返回与输入顺序一致的结果字典
+
+    单个牌局计算出错只影响该行的结果，不影响同批的其他牌局。
+    """
+    results = []
+    for line_no, item_id, state in chunk:
+        result = {"id": item_id, "line": line_no}
+        if isinstance(state, dict):
+            try:
+                result.update(ok=True, suggestions=suggest_many([state], search_workers=search_workers)[0])
+            except Exception as exc:
+                result.update(ok=False, error=f"{type(exc).__name__}: {exc}")
+        else:
+            result.update(ok=False, error=state)
+        results.append(result)
+    return results
+
+
+def analyze(lines, workers=None, chunk_size=64, time_limit=None, seed=0, search_workers=None):
+    """流式分析输入行，按输入顺序逐个产出结果
+
+    workers 为0或1时在当前进程计算；否则用进程池并行，
+    同时在计算的批次数有上限，内存占用与输入大小无关。
+    search_workers 为给出对手手牌的牌局中并行搜索候选出牌的进程数。
+    相同的输入和种子总是得到相同的结果。
+    """
+    chunks = read_chunks(lines, chunk_size, time_limit, seed)
+    if workers is not None and workers <= 1:
+        for chunk in chunks:
+            yield from _analyze_chunk(chunk, search_workers)
+        return
+
+    max_pending = (workers or os.cpu_count() or 1) * 2
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_analyze_chunk, chunk, search_workers))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="掼蛋命令行批量分析，输出JSONL")
+    parser.add_argument("input", nargs="?", default="-", help="输入文件（默认标准输入）")
+    parser.add_argument("--workers", type=int, default=None, help="计算进程数（默认CPU核数，0或1表示不使用进程池）")
+    parser.add_argument("--time-limit", type=float, default=None, help="每个牌局的计算时间上限（秒）")
+    parser.add_argument("--chunk-size", type=int, default=64, help="每批交给计算进程的牌局数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子（未单独指定种子的牌局使用）")
+    parser.add_argument("--search-workers", type=int, default=None,
+                        help="给出对手手牌的牌局中并行搜索候选出牌的进程数（默认不并行）")
+    args = parser.parse_args(argv)
+    print(f"随机种子: {args.seed}", file=sys.stderr)
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    try:
+        for result in analyze(source, args.workers, args.chunk_size, args.time_limit, args.seed,
+                              args.search_workers):
+            sys.stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+            sys.stdout.flush()
+    except BrokenPipeError:
+        pass
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+# 掼蛋残局精确求解器
+#
+# 手牌用13个牌值（3..15，其中2为15）的张数元组表示，
+# 出牌用 (牌型, 主牌值, 长度) 元组表示:
+#   ("single", 值, 1)  ("pair", 值, 1)  ("triple", 值, 1)
+#   ("full_house", 三张的值, 对子的值)
+#   ("sequence", 最大值, 张数)  ("pair_sequence", 最大值, 对数)  ("triple_sequence", 最大值, 三张数)
+#   ("bomb", 值, 张数)  ("straight_flush", 最大值, 5)
+# 张数元组不含花色，求解器不会自己生成同花顺，只在候选出牌或要压的牌是同花顺时用到。
+# 搜索为极小极大（负极大值写法）+ alpha-beta剪枝 + 走法排序 + 置换表，
+# 并设有节点预算（和可选的截止时间），超出时放弃求解交给启发式策略。
+
+import time
+import threading
+from GuandanMoves import bomb_strength
+
+MIN_VALUE = 3
+RANK_COUNT = 13
+WIN_SCORE = 1000
+
+# 连续牌型: 牌型 -> (每个牌值的张数, 最少连续牌值数)
+RUN_SHAPES = {
+    "sequence": (1, 5),
+    "pair_sequence": (2, 3),
+    "triple_sequence": (3, 2),
+}
+# 单一牌值的牌型 -> 张数
+SET_SIZES = {"single": 1, "pair": 2, "triple": 3}
+# 炸弹类牌型，按 bomb_strength 比大小
+BOMB_KINDS = ("bomb", "straight_flush")
+
+# 置换表条目类型
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class NodeBudgetExceeded(Exception):
+    """搜索节点数超过预算或到达截止时间"""
+
+
+def counts_from_values(values):
+    """把牌值列表转换为张数元组"""
+    counts = [0] * RANK_COUNT
+    for value in values:
+        counts[value - MIN_VALUE] += 1
+    return tuple(counts)
+
+
+def move_size(move):
+    """出牌包含的张数"""
+    kind, value, length = move
+    if kind in SET_SIZES:
+        return SET_SIZES[kind]
+    if kind == "full_house":
+        return 5
+    if kind in RUN_SHAPES:
+        return RUN_SHAPES[kind][0] * length
+    return length
+
+
+def generate_moves(counts):
+    """生成手牌能出的所有牌"""
+    moves = []
+    runs = dict.fromkeys(RUN_SHAPES, 0)  # 以当前牌值结尾的连续段长度
+    for i, count in enumerate(counts):
+        value = i + MIN_VALUE
+        for kind, size in SET_SIZES.items():
+            if count >= size:
+                moves.append((kind, value, 1))
+        if count >= 3:
+            # 三带二: 每种可带的对子各一个
+            for j, other in enumerate(counts):
+                if j != i and other >= 2:
+                    moves.append(("full_house", value, j + MIN_VALUE))
+        for size in range(4, count + 1):
+            moves.append(("bomb", value, size))
+        # 顺子、木板、钢板
+        for kind, (width, min_length) in RUN_SHAPES.items():
+            runs[kind] = runs[kind] + 1 if count >= width else 0
+            for length in range(min_length, runs[kind] + 1):
+                moves.append((kind, value, length))
+    return moves
+
+
+def beats(move, target):
+    """判断 move 能否压过 target（与引擎的压牌规则一致）"""
+    kind, value, length = move
+    target_kind, target_value, target_length = target
+    if kind in BOMB_KINDS:
+        if target_kind not in BOMB_KINDS:
+            return True
+        # 4张 < 5张 < 同花顺 < 6张 < ...，同级比牌值
+        return bomb_strength(kind, value, length) > bomb_strength(target_kind, target_value, target_length)
+    if kind != target_kind:
+        return False
+    if kind == "sequence":
+        # 允许用更长的顺子压制
+        return length > target_length or (length == target_length and value > target_value)
+    if kind in RUN_SHAPES:
+        # 木板、钢板须长度相同
+        return length == target_length and value > target_value
+    # 单张、对子、三张、三带二比主牌值
+    return value > target_value
+
+
+def apply_move(counts, move):
+    """返回出牌后的张数元组"""
+    kind, value, length = move
+    counts = list(counts)
+    if kind in RUN_SHAPES or kind == "straight_flush":
+        width = RUN_SHAPES[kind][0] if kind in RUN_SHAPES else 1
+        for v in range(value - length + 1, value + 1):
+            counts[v - MIN_VALUE] -= width
+    elif kind == "full_house":
+        counts[value - MIN_VALUE] -= 3
+        counts[length - MIN_VALUE] -= 2
+    else:
+        counts[value - MIN_VALUE] -= move_size(move)
+    return tuple(counts)
+
+
+class EndgameSolver:
+    """残局求解器
+
+    对手手牌已知时做完整的双人博弈搜索，只判断胜负；对手手牌未知时
+    把对手视为始终不出，求我方最少几手出完。分数为 ±(WIN_SCORE - 步数)，
+    正数表示当前出牌方获胜。
+    """
+    def __init__(self, node_budget=50000, table_limit=1 << 18):
+        self.node_budget = node_budget  # 每次求解的默认最大节点数
+        self.table_limit = table_limit  # 置换表最大条目数
+        self.table = {}
+        self.nodes = 0
+        self.deadline = None
+        self._limit = node_budget  # 本次求解的节点预算
+        # 复制出的AI在各自的后台线程中共用同一个求解器（和置换表），求解逐个进行
+        self._lock = threading.Lock()
+        self._stale = False  # 求解进行中被要求清空置换表，推迟到下一次求解开始前
+
+    def clear(self):
+        """清空置换表（换新的一局时释放内存）；正在求解时不等待，推迟到下一次求解前"""
+        if self._lock.acquire(blocking=False):
+            try:
+                self.table.clear()
+                self._stale = False
+            finally:
+                self._lock.release()
+        else:
+            self._stale = True
+
+    def solve(self, my_counts, opp_counts=None, to_beat=None, deadline=None, node_budget=None):
+        """求解当前局面
+
+        返回 (最佳出牌, 分数)，最佳出牌为None表示不出；
+        超出节点预算（默认为 self.node_budget）或到达截止时间（time.time()）时返回None。
+        """
+        if not any(my_counts):
+            return None
+        with self._lock:
+            return self._solve(my_counts, opp_counts, to_beat, deadline,
+                               self.node_budget if node_budget is None else node_budget)
+
+    def _solve(self, my_counts, opp_counts, to_beat, deadline, node_budget):
+        if self._stale or len(self.table) > self.table_limit:
+            self.table.clear()
+            self._stale = False
+        self.nodes = 0
+        self.deadline = deadline
+        self._limit = node_budget
+        key = (my_counts, opp_counts, to_beat)
+        if opp_counts is None:
+            # 求最少手数需要完整窗口
+            alpha, beta = -WIN_SCORE - 1, WIN_SCORE + 1
+        else:
+            # 双人博弈只需判断胜负，零窗口剪枝效率高得多
+            alpha, beta = -1, 1
+        try:
+            score = self._search(my_counts, opp_counts, to_beat, 0, alpha, beta)
+        except NodeBudgetExceeded:
+            return None
+        return self.table[key][2], score
+
+    def _ordered_moves(self, counts, to_beat, hint):
+        """生成并排序走法：置换表最佳走法优先，其次出牌多的，炸弹靠后，不出放最后"""
+        moves = generate_moves(counts)
+        if to_beat is not None:
+            moves = [move for move in moves if beats(move, to_beat)]
+        moves.sort(key=lambda m: (m[0] in BOMB_KINDS, -move_size(m), m[1]))
+        if to_beat is not None:
+            moves.append(None)  # 不出
+        if hint in moves:
+            moves.remove(hint)
+            moves.insert(0, hint)
+        return moves
+
+    def _search(self, cur, other, to_beat, ply, alpha, beta):
+        """负极大值搜索，cur 为当前出牌方手牌（None表示始终不出的一方）"""
+        self.nodes += 1
+        if self.nodes > self._limit:
+            raise NodeBudgetExceeded()
+        # 每1024个节点检查一次截止时间
+        if self.deadline is not None and not self.nodes & 1023 and time.time() > self.deadline:
+            raise NodeBudgetExceeded()
+
+        # 不出牌的一方只能让对方自由出牌
+        if cur is None:
+            return -self._search(other, None, None, ply + 1, -beta, -alpha)
+
+        key = (cur, other, to_beat)
+        entry = self.table.get(key)
+        hint = None
+        if entry is not None:
+            stored, flag, hint = entry
+            score = stored - ply if stored > 0 else stored + ply
+            if flag == EXACT:
+                return score
+            if flag == LOWER and score >= beta:
+                return score
+            if flag == UPPER and score <= alpha:
+                return score
+
+        moves = self._ordered_moves(cur, to_beat, hint)
+        total = sum(cur)
+
+        # 能一手出完直接获胜
+        for move in moves:
+            if move is not None and move_size(move) == total:
+                score = WIN_SCORE - (ply + 1)
+                self._store(key, score, EXACT, move, ply)
+                return score
+
+        alpha_orig = alpha
+        best_score = -WIN_SCORE - 1
+        best_move = None
+        for move in moves:
+            if move is None:
+                # 不出：对方重新自由出牌
+                score = -self._search(other, cur, None, ply + 1, -beta, -alpha)
+            else:
+                score = -self._search(other, apply_move(cur, move), move, ply + 1, -beta, -alpha)
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        if best_score <= alpha_orig:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self._store(key, best_score, flag, best_move, ply)
+        return best_score
+
+    def _store(self, key, score, flag, move, ply):
+        """写入置换表（分数换算为相对当前节点的步数）"""
+        stored = score + ply if score > 0 else score - ply
+        self.table[key] = (stored, flag, move)
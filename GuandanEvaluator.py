@@ -0,0 +1,134 @@
+from GuandanEndgame import RANK_COUNT, MIN_VALUE
+
+# 掼蛋手牌强度评估
+#
+# 手牌只按牌值张数元组（忽略花色）评估，得分由三部分组成:
+#   控制牌（A和2）数量、炸弹数量、出完所需的最少手数。
+# 结果按张数元组缓存，同一批候选出牌留下的剩余手牌经常相同，可直接命中。
+
+# 连续牌型: (每个牌值的张数, 最少连续牌值数)，顺子、木板、钢板
+RUN_SHAPES = ((1, 5), (2, 3), (3, 2))
+
+CONTROL_VALUES = (14, 15)  # A 和 2
+
+
+class HandEvaluator:
+    """带缓存的手牌强度评估器"""
+    CONTROL_WEIGHT = 3.0   # 每张控制牌加分
+    BOMB_WEIGHT = 8.0      # 每个炸弹加分
+    TURN_WEIGHT = 10.0     # 每多一手扣分
+
+    def __init__(self, cache_limit=200000):
+        self.cache_limit = cache_limit
+        self._scores = {}   # 张数元组 -> 得分
+        self._turns = {}    # 张数元组 -> 最少手数
+
+    def score(self, counts):
+        """手牌得分，越高越好"""
+        score = self._scores.get(counts)
+        if score is None:
+            if len(self._scores) >= self.cache_limit:
+                self._scores.clear()
+            controls = sum(counts[value - MIN_VALUE] for value in CONTROL_VALUES)
+            bombs = sum(1 for count in counts if count >= 4)
+            score = (self.CONTROL_WEIGHT * controls + self.BOMB_WEIGHT * bombs
+                     - self.TURN_WEIGHT * self.min_turns(counts))
+            self._scores[counts] = score
+        return score
+
+    def min_turns(self, counts):
+        """出完手牌所需的最少手数
+
+        每次只需考虑包含最小牌值的出牌（该牌值必然是这手牌的最低位），
+        递归结果按张数元组缓存。
+        """
+        if len(self._turns) >= self.cache_limit:
+            self._turns.clear()
+        return self._min_turns(counts)
+
+    def _min_turns(self, counts):
+        turns = self._turns.get(counts)
+        if turns is not None:
+            return turns
+
+        low = 0
+        while low < RANK_COUNT and not counts[low]:
+            low += 1
+        if low == RANK_COUNT:
+            return 0
+
+        best = None
+        rest = list(counts)
+        count = counts[low]
+
+        # 单张、对子、三张、炸弹（整组出）
+        for size in ((1, 2, 3, count) if count >= 4 else (1, 2, 3)):
+            if size > count:
+                continue
+            rest[low] = count - size
+            turns = 1 + self._min_turns(tuple(rest))
+            if best is None or turns < best:
+                best = turns
+        rest[low] = count
+
+        # 三带二: 最小牌值作三张时带代价最小的对子，作对子时跟最小的三张组合，
+        # 每种只试一个搭配而不是全部组合
+        if count >= 2:
+            for main, attach in ((low, self._cheapest_pair(counts, low)),
+                                 (self._lowest_triple(counts, low), low)):
+                if main is None or attach is None or counts[main] < 3:
+                    continue
+                rest[main] -= 3
+                rest[attach] -= 2
+                turns = 1 + self._min_turns(tuple(rest))
+                if turns < best:
+                    best = turns
+                rest[main] += 3
+                rest[attach] += 2
+
+        # 以最小牌值开头的顺子、木板、钢板
+        for width, min_length in RUN_SHAPES:
+            length = 0
+            while low + length < RANK_COUNT and counts[low + length] >= width:
+                length += 1
+            for run_length in range(min_length, length + 1):
+                run_rest = list(counts)
+                for rank in range(low, low + run_length):
+                    run_rest[rank] -= width
+                turns = 1 + self._min_turns(tuple(run_rest))
+                if turns < best:
+                    best = turns
+
+        self._turns[counts] = best
+        return best
+
+    @staticmethod
+    def _cheapest_pair(counts, exclude):
+        """三带二所带对子: 优先正好两张的最小牌值，其次不是炸弹的，最后才拆炸弹"""
+        best = None
+        best_key = None
+        for rank, count in enumerate(counts):
+            if count >= 2 and rank != exclude:
+                key = (count >= 4, count != 2, rank)
+                if best_key is None or key < best_key:
+                    best, best_key = rank, key
+        return best
+
+    @staticmethod
+    def _lowest_triple(counts, exclude):
+        """最小的（不拆炸弹的）三张牌值"""
+        for rank, count in enumerate(counts):
+            if count == 3 and rank != exclude:
+                return rank
+        return None
+
+
+# 进程内共享的默认评估器
+_default_evaluator = None
+
+def default_evaluator():
+    """返回进程内共享的评估器（缓存跨AI实例共享）"""
+    global _default_evaluator
+    if _default_evaluator is None:
+        _default_evaluator = HandEvaluator()
+    return _default_evaluator
@@ -0,0 +1,232 @@
+import os
+import gc
+import sys
+import random
+import argparse
+import tracemalloc
+
+# 掼蛋长时间运行的内存诊断
+#
+# MemoryMonitor 用 tracemalloc 周期性拍快照，报告两次快照之间内存增长最多的代码位置，
+# 界面以 --trace-memory 启动时每开始新的一局报告一次。
+# 本文件也可以直接运行做无界面的浸泡测试: 反复开新局、和四代AI对手打完一局，
+# 定期记录内存；后半程的内存增长超过上限时以返回码1退出。
+#   python GuandanMemory.py --cycles 2000          只驱动引擎
+#   python GuandanMemory.py --cycles 300 --gui     驱动离屏界面（历史面板、按钮池、后台线程）
+#   python GuandanMemory.py --cycles 300 --cache-limit 20000
+#                                                  调小缓存上限，少量对局即可让缓存进入稳定状态
+# 默认使用正式的缓存和置换表上限。
+
+# 不统计 tracemalloc 自身和导入机制的分配
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _format_size(size):
+    """字节数转为易读形式（带正负号）"""
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024 or unit == "MB":
+            return f"{size:+.1f}{unit}" if unit != "B" else f"{size:+d}B"
+        size /= 1024
+
+
+class MemoryMonitor:
+    """周期性的tracemalloc快照，报告增长最多的代码位置"""
+    def __init__(self, top=10, frames=1, out=sys.stderr):
+        self.top = top        # 每次报告的代码位置数
+        self.frames = frames  # 每次分配记录的调用栈深度
+        self.out = out
+        self.samples = []     # 每个检查点的已分配字节数
+        self._previous = None
+
+    def start(self):
+        """开始跟踪并拍下基准快照"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._previous = self._snapshot()
+
+    def stop(self):
+        self._previous = None
+        tracemalloc.stop()
+
+    def _snapshot(self):
+        gc.collect()  # 先回收循环引用，只留下真正存活的对象
+        return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+    def checkpoint(self, label):
+        """拍快照并报告与上一次相比增长最多的代码位置，返回当前已分配字节数"""
+        if self._previous is None:
+            self.start()
+        snapshot = self._snapshot()
+        current = sum(stat.size for stat in snapshot.statistics("filename"))
+        previous = self.samples[-1] if self.samples else None
+        self.samples.append(current)
+        if self.out is not None:
+            change = f"（较上次 {_format_size(current - previous)}）" if previous is not None else ""
+            print(f"[内存] {label}: 已分配 {current / 1048576:.1f}MB{change}", file=self.out)
+            growth = [stat for stat in snapshot.compare_to(self._previous, "lineno") if stat.size_diff > 0]
+            for stat in growth[:self.top]:
+                frame = stat.traceback[0]
+                print(f"  {_format_size(stat.size_diff):>10}  {stat.count_diff:+6d}块  "
+                      f"{os.path.basename(frame.filename)}:{frame.lineno}", file=self.out)
+        self._previous = snapshot
+        return current
+
+
+class EngineTable:
+    """浸泡测试中直接驱动引擎的牌桌"""
+    def __init__(self, seed):
+        from GuandanAssistan4 import GuandanAI
+        self.ai = GuandanAI(rng=random.Random(seed))
+
+    def new_game(self, hand):
+        self.ai.reset_game()
+        self.ai.update_hand(hand)
+
+    def hand(self):
+        return self.ai.hand_cards
+
+    def my_play(self):
+        """按AI的第一条建议出牌，返回出的牌"""
+        options = self.ai.suggest_play(force_recalculate=True)
+        cards = options[0]["cards"] if options else []
+        with self.ai.action():
+            self.ai.record_my_play(cards)
+            self.ai.reset_round()
+        return cards
+
+    def opponent_play(self, cards):
+        self.ai.record_opponent_play(cards)
+
+    def close(self):
+        self.ai.close()
+
+
+class WindowTable(EngineTable):
+    """浸泡测试中驱动离屏界面的牌桌（经过界面的出牌、历史记录和策略按钮）"""
+    def __init__(self, seed):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt5.QtWidgets import QApplication
+        from GuandanAssistan4 import GuandanAssistant
+        self.app = QApplication.instance() or QApplication(sys.argv[:1])
+        self.window = GuandanAssistant(seed=seed, history_log=None)
+        self.ai = self.window.ai
+
+    def new_game(self, hand):
+        self.window.start_new_game()
+        self.window.load_hand(hand)
+
+    def my_play(self):
+        """等后台分析完成后采用界面上的建议出牌"""
+        window = self.window
+        window.flush_suggestion()
+        for worker in list(window.suggestion_workers):
+            worker.wait()
+        self.app.processEvents()
+        self.app.processEvents()
+        cards = [window.suggestion_list.item(i).text() for i in range(window.suggestion_list.count())]
+        if cards:
+            window.play_suggested_cards()
+        else:
+            window.skip_turn()
+        self.app.processEvents()
+        return cards
+
+    def opponent_play(self, cards):
+        self.window.opponent_input.setText(" ".join(cards))
+        self.window.record_opponent_play()
+
+    def close(self):
+        self.window.close()
+        self.app.processEvents()
+
+
+def play_game(table, opponent, hand, opponent_hand, leader, max_turns=1000):
+    """在牌桌上和对手策略打完一局（leader为0时我方先手）"""
+    table.new_game(hand)
+    opponent_hand = list(opponent_hand)
+    opponent_seen = []
+    to_beat = []
+    mine = leader == 0
+    for _ in range(max_turns):
+        if mine:
+            to_beat = table.my_play()
+            if not table.hand():
+                return
+        else:
+            cards = list(opponent.choose(opponent_hand, to_beat, opponent_seen) or [])
+            remaining = list(opponent_hand)
+            try:
+                for card in cards:
+                    remaining.remove(card)
+            except ValueError:
+                cards = []  # 不在手牌中的出牌按不出处理
+            if cards:
+                opponent_hand = remaining
+                opponent_seen.extend(cards)
+                table.opponent_play(cards)
+                if not opponent_hand:
+                    return
+        mine = not mine
+
+
+def soak(cycles=2000, seed=0, gui=False, check_every=100, limit_mb=5.0, hand_size=13, decks=1,
+         cache_limit=None, out=sys.stderr):
+    """反复开局对局并定期检查内存，返回 (内存是否稳定, 后半程增长字节数)
+
+    默认使用正式的评估缓存和置换表上限，检查的就是实际运行的配置；
+    前半程用于填充这些有上限的缓存，只比较后半程首尾两个检查点，剩下的增长才是泄漏。
+    指定 cache_limit 时把上限调小到该值，缓存很快进入稳定状态，适合对局数少的快速检查。
+    """
+    from GuandanAssistan4 import GuandanAI
+    from GuandanEvaluator import default_evaluator
+    from GuandanTournament import Policy, deal
+    monitor = MemoryMonitor(out=out)
+    monitor.start()
+    table = WindowTable(seed) if gui else EngineTable(seed)
+    opponent = Policy(4, GuandanAI(rng=random.Random(seed + 1)))
+    if cache_limit is not None:
+        default_evaluator().cache_limit = cache_limit
+        for ai in (table.ai, opponent.ai):
+            ai.endgame_solver.table_limit = cache_limit
+    try:
+        for cycle in range(cycles):
+            hand, opponent_hand, leader = deal(seed + cycle, hand_size, decks)
+            opponent.ai.reset_game()  # 对手也开新局（它按局面载入，不会自行清空置换表）
+            play_game(table, opponent, hand, opponent_hand, leader)
+            if (cycle + 1) % check_every == 0 or cycle + 1 == cycles:
+                monitor.checkpoint(f"第{cycle + 1}局")
+    finally:
+        table.close()
+        opponent.ai.close()
+    samples = monitor.samples
+    growth = samples[-1] - samples[(len(samples) - 1) // 2] if len(samples) >= 2 else 0
+    return growth <= limit_mb * 1048576, growth
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="掼蛋长时间运行内存浸泡测试")
+    parser.add_argument("--cycles", type=int, default=2000, help="对局数")
+    parser.add_argument("--seed", type=int, default=0, help="起始随机种子")
+    parser.add_argument("--gui", action="store_true", help="驱动离屏界面而不只是引擎")
+    parser.add_argument("--check-every", type=int, default=100, help="每隔多少局检查一次内存")
+    parser.add_argument("--limit-mb", type=float, default=5.0, help="后半程允许的内存增长（MB）")
+    parser.add_argument("--hand-size", type=int, default=13, help="每人手牌张数")
+    parser.add_argument("--decks", type=int, default=1, help="使用几副牌")
+    parser.add_argument("--cache-limit", type=int, default=None,
+                        help="把评估缓存和置换表的条目上限调小到该值（快速检查用，默认使用正式上限）")
+    args = parser.parse_args(argv)
+
+    stable, growth = soak(args.cycles, args.seed, args.gui, args.check_every, args.limit_mb,
+                          args.hand_size, args.decks, args.cache_limit)
+    print(f"后半程内存增长 {_format_size(growth)}，上限 {args.limit_mb:.1f}MB: "
+          f"{'稳定' if stable else '持续增长'}", file=sys.stderr)
+    sys.exit(0 if stable else 1)
+
+
+if __name__ == "__main__":
+    main()
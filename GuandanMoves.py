@@ -0,0 +1,232 @@
+from bisect import bisect_right
+from heapq import merge
+from GuandanState import CARD_NAMES, CARD_INDEX, CARD_COUNT, RANK_COUNT
+
+# 掼蛋出牌索引
+#
+# 对一手牌按牌型和主牌值预先整理好所有出牌，回答
+# “能压过牌值r（长度L）的最小T型出牌”只需二分查找或直接取值，
+# 不必每次重新生成全部对子/顺子/炸弹再线性过滤。
+# 连续牌型只保存最大连续段，具体出牌由生成器按代价从小到大逐个产出，
+# 调用方取到前几个即可停止，大手牌也不会一次展开上百个顺子。
+
+MIN_VALUE = 3
+
+# 连续牌型: 牌型 -> (每个牌值的张数, 最少连续牌值数)
+# 顺子、木板（连对）、钢板（连三张）
+RUN_KINDS = {
+    "sequence": (1, 5),
+    "pair_sequence": (2, 3),
+    "triple_sequence": (3, 2),
+}
+
+
+def bomb_strength(kind, value, size):
+    """炸弹类牌型的大小: 4张 < 5张 < 同花顺 < 6张 < ...，同级比牌值"""
+    if kind == "straight_flush":
+        return (11, value)
+    return (size * 2, value)
+
+
+class MoveIndex:
+    """一手牌的出牌索引（手牌不变时可重复使用）"""
+    def __init__(self, state):
+        self.key = state.hand.tobytes()  # 对应的手牌，用于判断索引是否过期
+
+        # 同花顺用到的牌（每个同花顺的5张各占一张）
+        flush_cards = set()
+        straight_flushes = state.straight_flushes()
+        for suit, rank in straight_flushes:
+            flush_cards.update((rank + k) * 4 + suit for k in range(5))
+
+        # 每个牌值的具体牌: 不属于同花顺的在前（按花色顺序），同花顺用到的放最后，
+        # 普通牌型从前往后取，尽量不拆同花顺，也不会把同花顺当顺子出
+        self.rank_cards = [[] for _ in range(RANK_COUNT)]
+        kept = [[] for _ in range(RANK_COUNT)]
+        hand = state.hand
+        for index in range(CARD_COUNT):
+            count = hand[index]
+            if count:
+                if index in flush_cards:
+                    kept[index >> 2].append(CARD_NAMES[index])
+                    count -= 1
+                self.rank_cards[index >> 2].extend([CARD_NAMES[index]] * count)
+        for rank, cards in enumerate(kept):
+            self.rank_cards[rank].extend(cards)
+
+        # 单张和对子: 牌值升序排列
+        self.single_values = []
+        self.pair_values = []
+        for rank, cards in enumerate(self.rank_cards):
+            if cards:
+                self.single_values.append(rank + MIN_VALUE)
+            if len(cards) >= 2:
+                self.pair_values.append(rank + MIN_VALUE)
+
+        # 三张: 由张数至少为3的牌值掩码得出，牌值升序
+        triple_mask = state.level_masks[3]
+        self.triple_values = [rank + MIN_VALUE for rank in range(RANK_COUNT) if triple_mask >> rank & 1]
+        # 三带二所带的对子按代价排序: 先用正好两张的小对子，尽量不拆三张，最后才拆炸弹
+        self.attach_ranks = sorted(
+            (rank for rank, cards in enumerate(self.rank_cards) if len(cards) >= 2),
+            key=lambda rank: (len(self.rank_cards[rank]) >= 4, len(self.rank_cards[rank]) == 3, rank))
+
+        # 连续牌型: 牌型 -> 按起点升序的最大连续段 (起始牌值序号, 长度)
+        self.segments = {kind: state.runs(width, min_length)
+                         for kind, (width, min_length) in RUN_KINDS.items()}
+
+        # 炸弹（含同花顺）: 按大小升序
+        bombs = []
+        for rank, cards in enumerate(self.rank_cards):
+            if len(cards) >= 4:
+                bombs.append((bomb_strength("bomb", rank + MIN_VALUE, len(cards)), "bomb", cards))
+        for suit, rank in straight_flushes:
+            cards = [CARD_NAMES[(rank + k) * 4 + suit] for k in range(5)]
+            bombs.append((bomb_strength("straight_flush", rank + MIN_VALUE + 4, 5), "straight_flush", cards))
+        bombs.sort()
+        self.bomb_strengths = [strength for strength, _, _ in bombs]
+        self.bomb_kinds = [kind for _, kind, _ in bombs]
+        self.bombs = [cards for _, _, cards in bombs]
+
+    def single(self, above=0):
+        """牌值大于 above 的最小单张"""
+        i = bisect_right(self.single_values, above)
+        if i == len(self.single_values):
+            return []
+        return self.rank_cards[self.single_values[i] - MIN_VALUE][:1]
+
+    def pair(self, above=0):
+        """牌值大于 above 的最小对子"""
+        i = bisect_right(self.pair_values, above)
+        if i == len(self.pair_values):
+            return []
+        return self.rank_cards[self.pair_values[i] - MIN_VALUE][:2]
+
+    def pairs(self):
+        """所有对子（牌值升序）"""
+        return [self.rank_cards[value - MIN_VALUE][:2] for value in self.pair_values]
+
+    def triple(self, above=0):
+        """牌值大于 above 的最小三张"""
+        return next(self.iter_triples(above), [])
+
+    def full_house(self, above=0):
+        """三张牌值大于 above 的最小三带二"""
+        return next(self.iter_full_houses(above), [])
+
+    def iter_triples(self, above=0):
+        """按牌值从小到大逐个产出三张"""
+        for value in self.triple_values[bisect_right(self.triple_values, above):]:
+            yield self.rank_cards[value - MIN_VALUE][:3]
+
+    def iter_full_houses(self, above=0):
+        """按三张牌值从小到大逐个产出三带二
+
+        每个三张只带代价最小的对子，不生成三张与对子的全部组合。
+        """
+        for value in self.triple_values[bisect_right(self.triple_values, above):]:
+            rank = value - MIN_VALUE
+            for attach in self.attach_ranks:
+                if attach != rank:
+                    yield self.rank_cards[rank][:3] + self.rank_cards[attach][:2]
+                    break
+
+    def _run_cards(self, kind, low, length):
+        """从牌值序号 low 开始、长度为 length 的连续牌型的具体牌"""
+        width = RUN_KINDS[kind][0]
+        return [card for rank in range(low, low + length)
+                for card in self.rank_cards[rank][:width]]
+
+    def _plain_run(self, kind, low, length):
+        """普通连续牌型的具体牌；这几个牌值只剩同一花色的牌（取出来就是同花顺）时返回None
+
+        同花顺的牌已排在每个牌值的最后，取到的5张仍是同一花色说明没有别的牌可换，
+        这手牌只能作为同花顺（炸弹）出，由炸弹索引提供。
+        """
+        cards = self._run_cards(kind, low, length)
+        if kind == "sequence" and length == 5 and len({CARD_INDEX[card] & 3 for card in cards}) == 1:
+            return None
+        return cards
+
+    def run(self, kind, length, above=0):
+        """长度为 length、最大牌值大于 above 的最小连续牌型（木板/钢板/顺子）"""
+        for start, run_length in self.segments[kind]:
+            for top in range(max(above - MIN_VALUE + 1, start + length - 1), start + run_length):
+                cards = self._plain_run(kind, top - length + 1, length)
+                if cards:
+                    return cards
+        return []
+
+    def sequence(self, length, above=0):
+        """能压过长度为 length、最大牌值为 above 的顺子的最小顺子
+
+        优先同长度更大的顺子，没有时用更长的顺子（取最大牌值最小者）。
+        """
+        same_length = self.run("sequence", length, above)
+        if same_length:
+            return same_length
+        # 更长的顺子中最大牌值最小的是第一个够长的连续段开头的 length+1 张
+        for start, run_length in self.segments["sequence"]:
+            if run_length > length:
+                return self._run_cards("sequence", start, length + 1)
+        return []
+
+    def all_runs(self, kind):
+        """某种连续牌型的所有出牌（长的在前）"""
+        moves = list(self.iter_runs(kind))
+        moves.sort(key=len, reverse=True)
+        return moves
+
+    def iter_singles(self, above=0):
+        """按牌值从小到大逐个产出单张"""
+        for value in self.single_values[bisect_right(self.single_values, above):]:
+            yield self.rank_cards[value - MIN_VALUE][:1]
+
+    def iter_pairs(self, above=0):
+        """按牌值从小到大逐个产出对子"""
+        for value in self.pair_values[bisect_right(self.pair_values, above):]:
+            yield self.rank_cards[value - MIN_VALUE][:2]
+
+    def iter_runs(self, kind, above=0):
+        """按最大牌值从小到大逐个产出连续牌型，最大牌值相同时长的在前"""
+        min_length = RUN_KINDS[kind][1]
+        segments = self.segments[kind]
+        for top in range(max(above - MIN_VALUE + 1, 0), RANK_COUNT):
+            for start, run_length in segments:
+                if start <= top < start + run_length:
+                    for length in range(top - start + 1, min_length - 1, -1):
+                        cards = self._plain_run(kind, top - length + 1, length)
+                        if cards:
+                            yield cards
+                    break
+
+    def iter_bombs(self, above=None):
+        """按大小从小到大逐个产出炸弹（含同花顺）"""
+        i = 0 if above is None else bisect_right(self.bomb_strengths, above)
+        for cards in self.bombs[i:]:
+            yield list(cards)
+
+    def iter_moves(self):
+        """按代价从小到大逐个产出所有先手出牌 (牌型, 牌)
+
+        非炸弹按主牌值升序（相同时张数多的在前），炸弹最后。
+        """
+        def keyed(kind, moves, main=-1):
+            # main: 决定主牌值的牌在出牌中的位置（连续牌型为最后一张，三带二为第一张）
+            for cards in moves:
+                yield (CARD_INDEX[cards[main]] >> 2, -len(cards)), kind, cards
+
+        plain = merge(keyed("single", self.iter_singles()),
+                      keyed("pair", self.iter_pairs()),
+                      keyed("triple", self.iter_triples()),
+                      keyed("full_house", self.iter_full_houses(), main=0),
+                      *(keyed(kind, self.iter_runs(kind)) for kind in RUN_KINDS),
+                      key=lambda item: item[0])
+        for _, kind, cards in plain:
+            yield kind, cards
+        for kind, cards in zip(self.bomb_kinds, self.iter_bombs()):
+            yield kind, cards
+
+    def bomb(self, above=None):
+        """大小超过 above 的最小炸弹（above为None时返回最小炸弹）"""
+        return next(self.iter_bombs(above), [])
@@ -0,0 +1,195 @@
+import os
+import sys
+import mmap
+import struct
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from GuandanEndgame import EndgameSolver, generate_moves, apply_move, counts_from_values, WIN_SCORE
+
+# 掼蛋开局库
+#
+# 离线预计算各种手牌形状（只看牌值张数，忽略花色）的推荐首攻，
+# 存成按键排序的定长记录文件，引擎用内存映射按需读取、二分查找，
+# 无需解析；多个工作进程打开同一文件时共享只读页面。
+#
+# 文件格式（小端）:
+#   文件头 16字节: 魔数 b"GDOB", 版本(H), 记录长度(H), 记录数(I), 保留(I)
+#   记录   12字节: 手牌键(Q), 牌型编号(B), 主牌值(B), 长度(B), 保留(x)
+#   三带二的“长度”存所带对子的牌值（与求解器的出牌表示一致）
+
+MAGIC = b"GDOB"
+VERSION = 2  # 2: 增加三张、三带二、木板、钢板
+HEADER = struct.Struct("<4sHHII")
+RECORD = struct.Struct("<QBBBx")
+KEY = struct.Struct("<Q")
+
+# 牌型编号（0保留）
+MOVE_KINDS = ["", "single", "pair", "sequence", "bomb",
+              "triple", "full_house", "pair_sequence", "triple_sequence"]
+
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin")
+
+
+def encode_counts(counts):
+    """把13个牌值的张数编码为整数键（每位0..8，支持两副牌）"""
+    key = 0
+    for count in counts:
+        key = key * 9 + count
+    return key
+
+
+class OpeningBook:
+    """内存映射的只读开局库，首次查询时才打开文件"""
+    def __init__(self, path=DEFAULT_BOOK_PATH):
+        self.path = path
+        self._map = None
+        self._count = 0
+        self._loaded = False
+
+    def _load(self):
+        """打开并映射开局库文件；文件不存在或格式不符时视为空库"""
+        self._loaded = True
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                return
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, count, _ = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            data.close()
+            return
+        self._map = data
+        self._count = count
+
+    def __len__(self):
+        if not self._loaded:
+            self._load()
+        return self._count
+
+    def _key_at(self, index):
+        return KEY.unpack_from(self._map, HEADER.size + index * RECORD.size)[0]
+
+    def lookup(self, counts):
+        """查询手牌形状的推荐首攻，返回 (牌型, 主牌值, 长度) 或None"""
+        if not self._loaded:
+            self._load()
+        if self._map is None:
+            return None
+        key = encode_counts(counts)
+        # 在映射的记录上二分查找
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self._count:
+            return None
+        record_key, kind, value, length = RECORD.unpack_from(self._map, HEADER.size + lo * RECORD.size)
+        if record_key != key:
+            return None
+        return (MOVE_KINDS[kind], value, length)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._loaded = False
+
+
+# 进程内共享的默认开局库
+_default_book = None
+
+def default_book():
+    """返回默认路径的开局库（每个进程只映射一次）"""
+    global _default_book
+    if _default_book is None:
+        _default_book = OpeningBook(DEFAULT_BOOK_PATH)
+    return _default_book
+
+
+def best_opening(counts, solver):
+    """离线计算推荐首攻：出完所需手数最少，其次保留炸弹、先出小牌"""
+    best = None
+    best_key = None
+    for move in generate_moves(counts):
+        rest = apply_move(counts, move)
+        if any(rest):
+            result = solver.solve(rest)
+            if result is None:
+                continue  # 超出节点预算的候选不参与比较
+            turns = WIN_SCORE - result[1]
+        else:
+            turns = 0
+        key = (turns, move[0] == "bomb", move[1], -move[2])
+        if best_key is None or key < best_key:
+            best, best_key = move, key
+    return best
+
+
+def _compute_entries(hands):
+    """在工作进程中计算一批手牌形状的推荐首攻"""
+    solver = EndgameSolver(node_budget=200000)
+    entries = []
+    for counts in hands:
+        move = best_opening(counts, solver)
+        if move is not None:
+            entries.append((encode_counts(counts), MOVE_KINDS.index(move[0]), move[1], move[2]))
+    return entries
+
+
+def random_hands(count, hand_size=13, decks=1, seed=None):
+    """随机发牌生成不重复的手牌形状"""
+    rng = random.Random(seed)
+    deck = [value for value in range(3, 16) for _ in range(4 * decks)]
+    shapes = set()
+    attempts = 0
+    while len(shapes) < count and attempts < count * 10:
+        attempts += 1
+        shapes.add(counts_from_values(rng.sample(deck, hand_size)))
+    return sorted(shapes)
+
+
+def build_book(hands, path, workers=None, chunk_size=256):
+    """计算并写出开局库文件"""
+    chunks = [hands[i:i + chunk_size] for i in range(0, len(hands), chunk_size)]
+    entries = []
+    if workers == 1:
+        for chunk in chunks:
+            entries.extend(_compute_entries(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk_entries in pool.map(_compute_entries, chunks):
+                entries.extend(chunk_entries)
+    entries.sort()
+
+    # 先写临时文件再替换，避免正在读取的进程看到半个文件
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(entries), 0))
+        for entry in entries:
+            f.write(RECORD.pack(*entry))
+    os.replace(tmp_path, path)
+    return len(entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成掼蛋开局库")
+    parser.add_argument("--output", default=DEFAULT_BOOK_PATH, help="输出文件路径")
+    parser.add_argument("--hands", type=int, default=20000, help="随机生成的手牌形状数量")
+    parser.add_argument("--hand-size", type=int, default=13, help="每手牌张数")
+    parser.add_argument("--decks", type=int, default=1, help="使用几副牌")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("--workers", type=int, default=None, help="计算进程数（默认CPU核数）")
+    args = parser.parse_args(argv)
+
+    hands = random_hands(args.hands, args.hand_size, args.decks, args.seed)
+    count = build_book(hands, args.output, workers=args.workers)
+    print(f"开局库已生成: {args.output} ({count}条)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import os
+import sys
+import argparse
+from GuandanState import RANK_COUNT, CARD_INDEX
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，没有时不启用策略网络
+    np = None
+
+# 掼蛋策略网络（纯NumPy的小型多层感知机）
+#
+# 把牌局和候选出牌编码为定长特征向量，一次前向计算给所有候选打分（批量推理）。
+# 权重保存为单个 float32 的 .npy 文件，按内存映射加载，各层参数都是映射上的视图，
+# 多个进程加载同一文件时共享只读页面。
+#
+# 权重文件布局（一维数组）:
+#   [层数L, 各层宽度 d0..dL, W1(d0*d1), b1(d1), ..., WL(d(L-1)*dL), bL(dL)]
+#   d0 必须等于 FEATURE_SIZE，dL 必须为1；隐藏层用ReLU，输出层为线性。
+#
+# 特征（均缩放到0~1附近）:
+#   牌局  我方手牌13 + 我方已出13 + 对手已出13 + 要压的牌型10 + 要压的主牌值1
+#   出牌  牌型10 + 主牌值1 + 张数1 + 出牌后剩余手牌13
+
+MOVE_KINDS = ["single", "pair", "triple", "full_house", "sequence", "pair_sequence",
+              "triple_sequence", "bomb", "straight_flush", "pass"]
+STATE_SIZE = RANK_COUNT * 3 + len(MOVE_KINDS) + 1
+MOVE_SIZE = len(MOVE_KINDS) + 2 + RANK_COUNT
+FEATURE_SIZE = STATE_SIZE + MOVE_SIZE
+
+MAX_COUNT = 8.0    # 两副牌时每个牌值最多8张
+MAX_CARDS = 27.0   # 两副牌时每人最多27张
+
+DEFAULT_POLICY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "policy_weights.npy")
+
+
+def main_value(card_type):
+    """牌型的主牌值（3..15），不出或未知时为0"""
+    if "value" in card_type:
+        return card_type["value"]
+    return card_type.get("max", 0)
+
+
+def _rank_counts(cards):
+    """牌列表的13个牌值张数"""
+    counts = [0] * RANK_COUNT
+    for card in cards:
+        index = CARD_INDEX.get(card)
+        if index is not None:
+            counts[index >> 2] += 1
+    return counts
+
+
+def encode_state(ai):
+    """编码牌局特征（长度 STATE_SIZE）"""
+    features = np.zeros(STATE_SIZE, dtype=np.float32)
+    state = ai.state
+    features[:RANK_COUNT] = np.frombuffer(state.rank_counts, dtype=np.uint8)
+    played = np.frombuffer(state.played, dtype=np.uint8)
+    features[RANK_COUNT:2 * RANK_COUNT] = played.reshape(RANK_COUNT, 4).sum(axis=1)
+    for _, cards, _ in state.history:
+        for card in cards:
+            index = CARD_INDEX.get(card)
+            if index is not None:
+                features[2 * RANK_COUNT + (index >> 2)] += 1
+    features[:3 * RANK_COUNT] /= MAX_COUNT
+    if state.round_type:
+        kind = state.round_type["type"]
+        if kind in MOVE_KINDS:
+            features[3 * RANK_COUNT + MOVE_KINDS.index(kind)] = 1.0
+        features[STATE_SIZE - 1] = max(0, main_value(state.round_type) - 2) / RANK_COUNT
+    return features
+
+
+def encode_move(ai, cards, out):
+    """把一个候选出牌的特征写入 out（长度 MOVE_SIZE）"""
+    card_type = ai._identify_card_type(cards)
+    out[:] = 0.0
+    kind = card_type["type"]
+    if kind in MOVE_KINDS:
+        out[MOVE_KINDS.index(kind)] = 1.0
+    out[len(MOVE_KINDS)] = max(0, main_value(card_type) - 2) / RANK_COUNT
+    out[len(MOVE_KINDS) + 1] = len(cards) / MAX_CARDS
+    rest = np.frombuffer(ai.state.rank_counts, dtype=np.uint8) - np.array(_rank_counts(cards))
+    out[len(MOVE_KINDS) + 2:] = rest / MAX_COUNT
+
+
+class PolicyNetwork:
+    """从内存映射的权重文件加载的多层感知机"""
+    def __init__(self, path=DEFAULT_POLICY_PATH):
+        if np is None:
+            raise ImportError("策略网络需要安装numpy")
+        self.path = path
+        data = np.load(path, mmap_mode="r")
+        if data.dtype != np.float32 or data.ndim != 1:
+            raise ValueError(f"权重文件格式错误: {path}")
+        layer_count = int(data[0])
+        sizes = [int(size) for size in data[1:layer_count + 2]]
+        if sizes[0] != FEATURE_SIZE or sizes[-1] != 1:
+            raise ValueError(f"权重文件的输入输出宽度不符: {sizes}")
+        self.layers = []  # (W, b)，都是映射上的视图
+        offset = layer_count + 2
+        for fan_in, fan_out in zip(sizes, sizes[1:]):
+            weight = data[offset:offset + fan_in * fan_out].reshape(fan_in, fan_out)
+            offset += fan_in * fan_out
+            bias = data[offset:offset + fan_out]
+            offset += fan_out
+            self.layers.append((weight, bias))
+        if offset != len(data):
+            raise ValueError(f"权重文件长度不符: {path}")
+
+    def forward(self, features):
+        """批量前向计算，features 为 (候选数, FEATURE_SIZE)，返回每个候选的分数"""
+        x = features
+        last = len(self.layers) - 1
+        for i, (weight, bias) in enumerate(self.layers):
+            x = x @ weight + bias
+            if i < last:
+                np.maximum(x, 0.0, out=x)
+        return x[:, 0]
+
+    def score(self, ai, candidates):
+        """给同一局面下的若干候选出牌（牌列表）打分"""
+        features = np.empty((len(candidates), FEATURE_SIZE), dtype=np.float32)
+        features[:, :STATE_SIZE] = encode_state(ai)
+        for row, cards in zip(features, candidates):
+            encode_move(ai, cards, row[STATE_SIZE:])
+        return self.forward(features)
+
+    def rank(self, ai, options):
+        """按策略分数从高到低重新排序候选（写入 policy_score）"""
+        scores = self.score(ai, [option["cards"] for option in options])
+        for option, score in zip(options, scores):
+            option["policy_score"] = round(float(score), 3)
+        options.sort(key=lambda option: -option["policy_score"])
+        return options
+
+
+def save_weights(path, layers):
+    """把 [(W, b), ...] 按文件布局写成单个 .npy 文件"""
+    sizes = [layers[0][0].shape[0]] + [weight.shape[1] for weight, _ in layers]
+    parts = [np.array([len(layers)] + sizes, dtype=np.float32)]
+    for weight, bias in layers:
+        parts.append(np.asarray(weight, dtype=np.float32).ravel())
+        parts.append(np.asarray(bias, dtype=np.float32).ravel())
+    # 先写临时文件再替换，避免正在映射的进程读到半个文件
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, np.concatenate(parts))
+    os.replace(tmp_path, path)
+
+
+def random_weights(hidden=(64, 32), seed=None):
+    """随机初始化的权重（He初始化），用于搭建训练流程"""
+    rng = np.random.default_rng(seed)
+    sizes = [FEATURE_SIZE] + list(hidden) + [1]
+    return [(rng.normal(0.0, np.sqrt(2.0 / fan_in), (fan_in, fan_out)), np.zeros(fan_out))
+            for fan_in, fan_out in zip(sizes, sizes[1:])]
+
+
+# 进程内共享的默认策略网络
+_default_policy = None
+_default_loaded = False
+
+def default_policy():
+    """加载默认路径的策略网络；没有numpy或没有权重文件时返回None"""
+    global _default_policy, _default_loaded
+    if not _default_loaded:
+        _default_loaded = True
+        if np is not None and os.path.exists(DEFAULT_POLICY_PATH):
+            try:
+                _default_policy = PolicyNetwork(DEFAULT_POLICY_PATH)
+            except ValueError as exc:
+                print(f"忽略策略网络权重: {exc}", file=sys.stderr)
+    return _default_policy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="掼蛋策略网络权重工具")
+    parser.add_argument("--init", metavar="PATH", help="写出随机初始化的权重文件（用于搭建训练流程）")
+    parser.add_argument("--hidden", type=int, nargs="+", default=[64, 32], help="隐藏层宽度")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("--check", metavar="PATH", help="检查权重文件并输出各层形状")
+    args = parser.parse_args(argv)
+    if np is None:
+        parser.error("需要安装numpy")
+    if args.init:
+        save_weights(args.init, random_weights(args.hidden, args.seed))
+        print(f"已写出随机权重: {args.init}", file=sys.stderr)
+    if args.check:
+        network = PolicyNetwork(args.check)
+        for weight, bias in network.layers:
+            print(f"{weight.shape[0]} -> {weight.shape[1]}")
+
+
+if __name__ == "__main__":
+    main()
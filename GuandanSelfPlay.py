@@ -0,0 +1,265 @@
+import os
+import sys
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from GuandanState import GameState, RANK_COUNT, CARD_INDEX
+from GuandanMoves import MoveIndex
+from GuandanPolicy import MOVE_KINDS, main_value
+from GuandanTournament import deal, play_game, worker_policies
+
+try:
+    import numpy as np
+except ImportError:  # 导出数据集需要numpy
+    np = None
+
+# 掼蛋自我对弈数据集导出
+#
+# 用对战评测的无界面对局循环让AI对弈，把每次决策记为一条记录:
+# (局面, 合法出牌, 实际出牌, 胜负)，按批写入压缩的 .npz 分块文件，
+# 内存占用只与分块大小有关，与对局数无关。
+#
+# 每个分块文件的数组（第 i 条记录的合法出牌为 legal[legal_offsets[i]:legal_offsets[i+1]]）:
+#   version        格式版本号 SCHEMA_VERSION
+#   state          (N, 42) uint8  我方手牌13 + 我方已出13 + 对手已出13 + 对手剩余张数 + 要压的牌型 + 要压的主牌值
+#   legal          (M, 15) uint8  牌型 + 主牌值 + 出牌的13个牌值张数（不出为 pass 牌型、全0）
+#   legal_offsets  (N+1,) int32
+#   chosen         (N,) int16     实际出牌在本条合法出牌中的序号
+#   outcome        (N,) int8      出牌方最终 1胜 -1负 0和
+#   game           (N,) int64     对局编号（种子*2+是否交换座位）
+#   ply            (N,) int16     本局第几次决策
+#   generation     (N,) uint8     出牌方的程序代数
+# 牌型编号为 GuandanPolicy.MOVE_KINDS 中的序号，牌值为3..15（先手时要压的主牌值为0）。
+
+SCHEMA_VERSION = 1
+STATE_WIDTH = RANK_COUNT * 3 + 3
+MOVE_WIDTH = RANK_COUNT + 2
+PASS_KIND = MOVE_KINDS.index("pass")
+PASS_ROW = bytes([PASS_KIND] + [0] * (MOVE_WIDTH - 1))
+RECORD_FIELDS = ("state", "legal", "legal_count", "chosen", "outcome", "game", "ply", "generation")
+
+
+def _count_ranks(row, offset, cards):
+    """把牌列表的牌值张数累加到 row[offset:offset+13]"""
+    for card in cards:
+        index = CARD_INDEX.get(card)
+        if index is not None:
+            row[offset + (index >> 2)] += 1
+
+
+def move_row(card_type, cards):
+    """编码一个出牌（长度 MOVE_WIDTH 的字节串）"""
+    row = bytearray(MOVE_WIDTH)
+    row[0] = MOVE_KINDS.index(card_type["type"])
+    row[1] = main_value(card_type)
+    _count_ranks(row, 2, cards)
+    return bytes(row)
+
+
+def state_row(hand, seen, seat, to_beat_type, hand_size):
+    """编码出牌方看到的局面（长度 STATE_WIDTH 的字节串）"""
+    row = bytearray(STATE_WIDTH)
+    _count_ranks(row, 0, hand)
+    _count_ranks(row, RANK_COUNT, seen[seat])
+    _count_ranks(row, RANK_COUNT * 2, seen[1 - seat])
+    row[RANK_COUNT * 3] = hand_size - len(seen[1 - seat])
+    if to_beat_type is None:
+        row[RANK_COUNT * 3 + 1] = PASS_KIND
+    else:
+        row[RANK_COUNT * 3 + 1] = MOVE_KINDS.index(to_beat_type["type"])
+        row[RANK_COUNT * 3 + 2] = main_value(to_beat_type)
+    return bytes(row)
+
+
+class GameRecorder:
+    """收集若干局的决策记录（作为 play_game 的 record 回调）"""
+    def __init__(self, referee, hand_size):
+        self.referee = referee
+        self.hand_size = hand_size
+        self.states = []
+        self.legal = []
+        self.legal_count = []
+        self.chosen = []
+        self.outcome = []
+        self.game = []
+        self.ply = []
+        self.generation = []
+        self._game_start = 0
+        self._seats = []
+
+    def start_game(self, game, generations):
+        self._game_id = game
+        self._generations = generations
+        self._game_start = len(self.states)
+        self._seats = []
+
+    def __call__(self, seat, hand, to_beat_type, seen, cards):
+        legal = self.legal_moves(hand, to_beat_type)
+        row = move_row(self.referee.card_type(cards), cards)
+        index = legal.get(row)
+        if index is None:
+            # 策略出的牌不在枚举范围内（如三带二带了别的对子），补进合法出牌
+            index = len(legal)
+            legal[row] = index
+        self.states.append(state_row(hand, seen, seat, to_beat_type, self.hand_size))
+        self.legal.extend(legal)
+        self.legal_count.append(len(legal))
+        self.chosen.append(index)
+        self.game.append(self._game_id)
+        self.ply.append(len(self._seats))
+        self.generation.append(self._generations[seat])
+        self._seats.append(seat)
+
+    def legal_moves(self, hand, to_beat_type):
+        """手牌能出的合法出牌，返回 编码 -> 序号（保持生成顺序）"""
+        state = GameState()
+        state.set_hand(hand)
+        legal = {}
+        for _, cards in MoveIndex(state).iter_moves():
+            card_type = self.referee.card_type(cards)
+            if to_beat_type is None or self.referee.beats(card_type, to_beat_type):
+                legal.setdefault(move_row(card_type, cards), len(legal))
+        if to_beat_type is not None:
+            legal.setdefault(PASS_ROW, len(legal))
+        return legal
+
+    def end_game(self, winner):
+        """对局结束，按出牌方填写胜负"""
+        for seat in self._seats:
+            self.outcome.append(0 if winner is None else (1 if seat == winner else -1))
+
+    def arrays(self):
+        """把收集的记录转为数组字典"""
+        return {
+            "state": np.frombuffer(b"".join(self.states), dtype=np.uint8).reshape(-1, STATE_WIDTH),
+            "legal": np.frombuffer(b"".join(self.legal), dtype=np.uint8).reshape(-1, MOVE_WIDTH),
+            "legal_count": np.array(self.legal_count, dtype=np.int32),
+            "chosen": np.array(self.chosen, dtype=np.int16),
+            "outcome": np.array(self.outcome, dtype=np.int8),
+            "game": np.array(self.game, dtype=np.int64),
+            "ply": np.array(self.ply, dtype=np.int16),
+            "generation": np.array(self.generation, dtype=np.uint8),
+        }
+
+
+def _record_games(task):
+    """在工作进程中对弈若干副牌并返回记录数组"""
+    generations, seeds, hand_size, decks = task
+    referee, policies = worker_policies(generations)
+    recorder = GameRecorder(referee, hand_size)
+    # 同一代自我对弈时交换座位得到的是同一局，只打一次
+    seatings = [(0, 1)] if generations[0] == generations[1] else [(0, 1), (1, 0)]
+    for seed in seeds:
+        hand0, hand1, leader = deal(seed, hand_size, decks)
+        for swap, seats in enumerate(seatings):
+            recorder.start_game(seed * 2 + swap, [generations[seats[0]], generations[seats[1]]])
+            winner, _ = play_game([policies[seats[0]], policies[seats[1]]], referee,
+                                  (hand0, hand1), leader, seed, record=recorder)
+            recorder.end_game(winner)
+    return recorder.arrays()
+
+
+class DatasetWriter:
+    """把记录数组按块写成压缩的 .npz 文件（每块约 chunk_size 条记录）"""
+    def __init__(self, directory, chunk_size=50000, prefix="selfplay"):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.prefix = prefix
+        self.records = 0
+        self.paths = []
+        self._pending = []
+        self._pending_records = 0
+        os.makedirs(directory, exist_ok=True)
+        # 接着目录中已完成分块的最大编号写，不覆盖之前导出的数据
+        # （分块被删除或留下未写完的临时文件时，按文件个数计数会指向已有的分块）
+        indices = [name[len(prefix) + 1:-4] for name in os.listdir(directory)
+                   if name.startswith(prefix + "-") and name.endswith(".npz")]
+        indices = [int(index) for index in indices if index.isdigit()]
+        self._next_index = max(indices) + 1 if indices else 0
+
+    def add(self, arrays):
+        self._pending.append(arrays)
+        self._pending_records += len(arrays["chosen"])
+        if self._pending_records >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """把缓冲的记录写成一个分块文件"""
+        if not self._pending_records:
+            return
+        chunk = {name: np.concatenate([arrays[name] for arrays in self._pending])
+                 for name in RECORD_FIELDS}
+        legal_count = chunk.pop("legal_count")
+        chunk["legal_offsets"] = np.concatenate(([0], np.cumsum(legal_count))).astype(np.int32)
+        path = os.path.join(self.directory, f"{self.prefix}-{self._next_index:05d}.npz")
+        tmp_path = path[:-4] + ".tmp.npz"
+        np.savez_compressed(tmp_path, version=np.int16(SCHEMA_VERSION), **chunk)
+        os.replace(tmp_path, path)
+        self._next_index += 1
+        self.records += self._pending_records
+        self.paths.append(path)
+        self._pending = []
+        self._pending_records = 0
+
+
+def iter_chunks(directory, prefix="selfplay"):
+    """按顺序读取目录中的分块文件，逐个产出数组字典"""
+    for name in sorted(os.listdir(directory)):
+        if name.startswith(prefix + "-") and name.endswith(".npz") and ".tmp." not in name:
+            with np.load(os.path.join(directory, name)) as data:
+                if int(data["version"]) != SCHEMA_VERSION:
+                    raise ValueError(f"数据格式版本不符: {name}")
+                yield {key: data[key] for key in data.files}
+
+
+def export(directory, generations=(4, 4), deals=1000, seed=0, workers=None, hand_size=13, decks=1,
+           chunk_size=50000, batch_size=20):
+    """自我对弈 deals 副牌并导出到 directory，返回 DatasetWriter"""
+    writer = DatasetWriter(directory, chunk_size)
+    tasks = ((tuple(generations), [seed + i for i in range(start, min(deals, start + batch_size))],
+              hand_size, decks) for start in range(0, deals, batch_size))
+    if workers is not None and workers <= 1:
+        for task in tasks:
+            writer.add(_record_games(task))
+    else:
+        # 同时在计算的批次数有上限，结果按提交顺序写出
+        max_pending = (workers or os.cpu_count() or 1) * 2
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.submit(_record_games, task))
+                if len(pending) >= max_pending:
+                    writer.add(pending.popleft().result())
+            while pending:
+                writer.add(pending.popleft().result())
+    writer.flush()
+    return writer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="掼蛋自我对弈数据集导出")
+    parser.add_argument("output", help="输出目录")
+    parser.add_argument("--generations", type=int, nargs=2, default=[4, 4], choices=[1, 2, 3, 4],
+                        metavar="GEN", help="对弈双方的程序代数（默认四代自我对弈）")
+    parser.add_argument("--deals", type=int, default=1000, help="发牌数")
+    parser.add_argument("--seed", type=int, default=0, help="起始随机种子")
+    parser.add_argument("--workers", type=int, default=None, help="对局进程数（默认CPU核数，0或1表示不使用进程池）")
+    parser.add_argument("--hand-size", type=int, default=13, help="每人手牌张数")
+    parser.add_argument("--decks", type=int, default=1, help="使用几副牌")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="每个分块文件的记录数")
+    args = parser.parse_args(argv)
+    if np is None:
+        parser.error("需要安装numpy")
+
+    started = time.time()
+    writer = export(args.output, args.generations, args.deals, args.seed, args.workers,
+                    args.hand_size, args.decks, args.chunk_size)
+    elapsed = time.time() - started
+    rate = writer.records / elapsed if elapsed > 0 else 0.0
+    print(f"共{writer.records}条记录，写出{len(writer.paths)}个分块，用时{elapsed:.1f}秒，{rate:.0f}条/秒",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
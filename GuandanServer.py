@@ -0,0 +1,228 @@
+import os
+import sys
+import json
+import asyncio
+import argparse
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from GuandanAssistan4 import GuandanAI, suggest_many
+from GuandanCLI import validate_cards
+
+# 本地出牌建议服务（一个进程服务多张牌桌）
+#
+# 协议: 每行一个JSON对象，请求与响应一一对应
+#   {"id": 1, "table": "t1", "op": "hand", "cards": ["红桃5", ...], "suggest": true}
+# op 取值:
+#   hand      更新手牌
+#   opponent  记录对手出牌
+#   opponent_hand  设置已知的对手剩余手牌（cards 为空表示未知），建议会按搜索结果排序
+#   play      记录我方出牌
+#   pass      我方跳过
+#   suggest   获取出牌建议
+#   state     获取牌桌状态
+#   reset     重置牌桌
+#   close     关闭牌桌会话
+# 响应: {"id": 1, "table": "t1", "ok": true, "suggestions": [...]}
+# 请求不合法或处理出错时响应 {"ok": false, "error": ...}，连接保持，可继续发送请求
+
+class TableSession:
+    """单张牌桌的会话状态"""
+    def __init__(self, table_id):
+        self.table_id = table_id
+        self.ai = GuandanAI()
+        self.lock = asyncio.Lock()  # 同一牌桌的事件按顺序处理
+
+
+class SuggestionServer:
+    """基于asyncio的多牌桌建议服务"""
+    def __init__(self, workers=None, batch_size=32, search_workers=None):
+        self.sessions = {}  # 牌桌ID -> TableSession
+        # workers=0 时在事件循环线程内直接计算（仅用于调试）
+        self.pool = ProcessPoolExecutor(max_workers=workers) if workers != 0 else None
+        self.workers = workers or os.cpu_count() or 1  # 进程池的进程数，每批按此切分
+        self.batch_size = batch_size
+        self.search_workers = search_workers  # 对手手牌已知时每个局面并行搜索候选的进程数
+        self._pending = []  # 等待合批计算的 (状态, future)
+
+    def get_session(self, table_id):
+        """获取或创建牌桌会话"""
+        session = self.sessions.get(table_id)
+        if session is None:
+            session = TableSession(table_id)
+            self.sessions[table_id] = session
+        return session
+
+    async def suggest(self, ai):
+        """提交建议计算；同一轮事件循环内的请求合并成一批交给进程池"""
+        state = {
+            "hand": list(ai.hand_cards),
+            "to_beat": list(ai.current_round_cards),
+            "seen": list(ai.played_cards),
+            "turn": ai.current_turn,
+        }
+        if ai.opponent_hand_cards is not None:
+            state["opponent"] = list(ai.opponent_hand_cards)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._pending:
+            loop.call_soon(self._flush_pending)
+        self._pending.append((state, future))
+        return await future
+
+    def _flush_pending(self):
+        """把积累的请求按批次提交计算"""
+        pending, self._pending = self._pending, []
+        for i in range(0, len(pending), self.batch_size):
+            batch = pending[i:i + self.batch_size]
+            asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(self, batch):
+        """计算一批建议并唤醒等待的请求"""
+        states = [state for state, _ in batch]
+        try:
+            compute = partial(suggest_many, search_workers=self.search_workers)
+            if self.pool is None:
+                results = compute(states)
+            else:
+                # 按进程数切成若干份分别提交，一批请求分散到所有计算进程上，不排在同一个进程里
+                size = -(-len(states) // self.workers)
+                loop = asyncio.get_running_loop()
+                parts = await asyncio.gather(*(loop.run_in_executor(self.pool, compute, states[i:i + size])
+                                               for i in range(0, len(states), size)))
+                results = [result for part in parts for result in part]
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def handle_request(self, request):
+        """处理单条请求并返回响应"""
+        table_id = request.get("table")
+        op = request.get("op")
+        cards = request.get("cards")
+        response = {"id": request.get("id"), "table": table_id, "ok": True}
+
+        if table_id is None:
+            return dict(response, ok=False, error="缺少牌桌ID")
+        if not isinstance(table_id, (str, int)) or isinstance(table_id, bool):
+            return dict(response, ok=False, error="牌桌ID必须是字符串或整数")
+        if cards is None:
+            cards = []
+        else:
+            try:
+                validate_cards("cards", cards)
+            except ValueError as exc:
+                return dict(response, ok=False, error=str(exc))
+
+        if op == "close":
+            self.sessions.pop(table_id, None)
+            return response
+
+        session = self.get_session(table_id)
+        async with session.lock:
+            ai = session.ai
+            want_suggestion = bool(request.get("suggest"))
+
+            if op == "hand":
+                ai.update_hand(cards)
+            elif op == "opponent":
+                ai.record_opponent_play(cards)
+            elif op == "opponent_hand":
+                ai.record_opponent_hand(cards or None)
+            elif op == "play":
+                # 与界面一致：出牌后重置当前轮次
+                ai.record_my_play(cards)
+                ai.reset_round()
+            elif op == "pass":
+                ai.record_my_play([])
+                ai.reset_round()
+            elif op == "reset":
+                ai.reset_game()
+            elif op == "state":
+                response["state"] = ai.get_game_state()
+            elif op == "suggest":
+                want_suggestion = True
+            else:
+                return dict(response, ok=False, error=f"未知操作: {op}")
+
+            if want_suggestion:
+                response["suggestions"] = await self.suggest(ai)
+        return response
+
+    async def handle_connection(self, reader, writer):
+        """处理一个客户端连接，逐行读取请求"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    response = {"ok": False, "error": "无效的JSON"}
+                else:
+                    if isinstance(request, dict):
+                        try:
+                            response = await self.handle_request(request)
+                        except Exception as exc:
+                            # 单条请求出错只回复错误，不断开连接
+                            response = {"id": request.get("id"), "ok": False,
+                                        "error": f"{type(exc).__name__}: {exc}"}
+                    else:
+                        response = {"ok": False, "error": "请求必须是JSON对象"}
+                writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def shutdown(self):
+        """关闭进程池"""
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+
+async def serve(args):
+    """启动服务并一直运行"""
+    server = SuggestionServer(workers=args.workers, batch_size=args.batch_size,
+                              search_workers=args.search_workers)
+    try:
+        if args.unix:
+            listener = await asyncio.start_unix_server(server.handle_connection, path=args.unix)
+            address = args.unix
+        else:
+            listener = await asyncio.start_server(server.handle_connection, args.host, args.port)
+            address = f"{args.host}:{args.port}"
+        print(f"掼蛋建议服务已启动: {address}", file=sys.stderr)
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="掼蛋本地出牌建议服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    parser.add_argument("--unix", help="使用Unix套接字路径代替TCP")
+    parser.add_argument("--workers", type=int, default=None, help="计算进程数（默认CPU核数，0表示不使用进程池）")
+    parser.add_argument("--batch-size", type=int, default=32, help="每批合并计算的最大请求数")
+    parser.add_argument("--search-workers", type=int, default=None,
+                        help="对手手牌已知时每个局面并行搜索候选出牌的进程数（默认不并行）")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import struct
+import threading
+from multiprocessing import shared_memory
+from GuandanEndgame import RANK_COUNT
+
+# 搜索工作进程共享的牌局状态
+#
+# 每次搜索排序时把本方手牌、对手手牌、节点预算和截止时间写入共享内存的一个槽位，
+# 各候选任务只传 (共享块名, 槽位, 序号) 和候选出牌本身，工作进程第一次用到时按名字挂载
+# 共享块，之后直接从共享内存读取，不再为每个候选序列化整手牌。
+# 开局库本身是内存映射的文件，各进程已经共享同一份只读页面，不需要再放进共享块。
+#
+# 槽位布局（小端，无填充）:
+#   序号u64  截止时间f64  节点预算u32  本方13个牌值张数u8  对手13个牌值张数u8
+# 槽位按环形复用；写入时先把序号清零，写完再写序号，读取前后序号不一致（槽位已被
+# 新的搜索复用）时放弃该任务，按未完成评估处理。
+
+SLOT = struct.Struct(f"<QdI{RANK_COUNT}B{RANK_COUNT}B")
+SEQUENCE = struct.Struct("<Q")
+
+
+class SharedSearchState:
+    """主进程一侧: 创建共享块并按槽位发布每次搜索的牌局状态"""
+    def __init__(self, slots=64):
+        self.slots = slots
+        self.shm = shared_memory.SharedMemory(create=True, size=SLOT.size * slots)
+        self.name = self.shm.name
+        self._sequence = 0
+        self._lock = threading.Lock()  # 复制出的AI在各自的后台线程中共用同一共享块
+
+    def publish(self, my_counts, opp_counts, node_budget, deadline):
+        """写入一次搜索的牌局状态，返回任务携带的引用 (共享块名, 槽位, 序号)"""
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+            slot = sequence % self.slots
+            offset = slot * SLOT.size
+            buf = self.shm.buf
+            SEQUENCE.pack_into(buf, offset, 0)
+            SLOT.pack_into(buf, offset, 0, deadline, node_budget, *my_counts, *opp_counts)
+            SEQUENCE.pack_into(buf, offset, sequence)
+        return self.name, slot, sequence
+
+    def close(self):
+        """释放共享块（由创建者在关闭进程池后调用）"""
+        self.shm.close()
+        self.shm.unlink()
+
+
+# 工作进程中已挂载的共享块（每个进程池对应一个共享块）
+_attached = {}
+
+def read_state(name, slot, sequence):
+    """工作进程读取槽位中的牌局状态
+
+    返回 (本方张数元组, 对手张数元组, 节点预算, 截止时间)，槽位已被复用时返回None。
+    """
+    shm = _attached.get(name)
+    if shm is None:
+        shm = _attached[name] = shared_memory.SharedMemory(name=name)
+    offset = slot * SLOT.size
+    values = SLOT.unpack_from(shm.buf, offset)
+    if values[0] != sequence or SEQUENCE.unpack_from(shm.buf, offset)[0] != sequence:
+        return None
+    counts = values[3:]
+    return counts[:RANK_COUNT], counts[RANK_COUNT:], values[2], values[1]
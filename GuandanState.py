@@ -0,0 +1,280 @@
+from array import array
+
+# 紧凑的掼蛋牌局状态
+#
+# 手牌和已出牌用定长数组按牌计数（支持两副牌），其余状态为整数或不可变元组，
+# 因此快照只需复制几个小数组。每个修改操作返回一个小的差异元组，
+# 用 undo()/redo() 即可撤销或重做（撤销重做功能和搜索的出牌/回退共用）。
+# 另外按花色维护牌值位掩码（第r位表示持有该花色牌值序号r的牌），
+# 同花顺等依赖花色的牌型用移位与运算即可找出。
+# 同样按张数阈值维护牌值位掩码（至少1/2/3张），每次出牌只改动一位，
+# 顺子、木板（连对）、钢板（连三张）的最大连续段由掩码直接求出。
+
+SUITS = ["红桃", "方块", "梅花", "黑桃"]
+VALUE_NAMES = ["3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A", "2"]  # 对应牌值3..15
+RANK_COUNT = len(VALUE_NAMES)
+
+# 牌编号 = 牌值序号 * 4 + 花色序号，按编号遍历即按牌值从小到大
+CARD_NAMES = [suit + name for name in VALUE_NAMES for suit in SUITS]
+CARD_INDEX = {name: i for i, name in enumerate(CARD_NAMES)}
+CARD_COUNT = len(CARD_NAMES)
+
+# 出牌方
+ME, OPPONENT = 0, 1
+
+# 连续段索引维护的最高张数阈值（顺子1、木板2、钢板3）
+MAX_LEVEL = 3
+
+
+class GameState:
+    """牌局状态（__slots__ + 定长数组）"""
+    __slots__ = ("hand", "rank_counts", "suit_masks", "level_masks", "hand_size", "extra",
+                 "played", "played_extra", "round_cards", "round_type",
+                 "turn", "round_count", "history", "version",
+                 "_hand_cache", "_cache_version")
+
+    def __init__(self):
+        self.history = []  # 对手出牌历史（只追加，快照记录长度）
+        self.version = 0   # 每次修改递增（重置也递增），供缓存判断是否失效
+        self.reset()
+
+    def reset(self):
+        """重置为空牌局"""
+        self.hand = array("B", bytes(CARD_COUNT))         # 每张牌的张数
+        self.rank_counts = array("B", bytes(RANK_COUNT))  # 每个牌值的张数
+        self.suit_masks = [0] * len(SUITS)               # 每个花色的牌值位掩码
+        self.level_masks = [0] * (MAX_LEVEL + 1)         # 第k项: 张数至少为k的牌值位掩码
+        self.hand_size = 0
+        self.extra = ()          # 无法识别的手牌
+        self.played = array("B", bytes(CARD_COUNT))       # 我方已出的牌
+        self.played_extra = ()   # 无法识别的已出牌
+        self.round_cards = ()    # 当前轮对手出的牌
+        self.round_type = None   # 对手出牌类型
+        self.turn = ME
+        self.round_count = 0
+        del self.history[:]
+        self.version += 1
+        self._hand_cache = []
+        self._cache_version = -1
+
+    def set_hand(self, cards):
+        """设置手牌，返回差异"""
+        cards = list(cards)
+        delta = ("hand", self.hand, self.rank_counts, self.suit_masks, self.level_masks,
+                 self.hand_size, self.extra, cards)
+        self.hand = array("B", bytes(CARD_COUNT))
+        self.rank_counts = array("B", bytes(RANK_COUNT))
+        self.suit_masks = [0] * len(SUITS)
+        self.level_masks = [0] * (MAX_LEVEL + 1)
+        self.hand_size = 0
+        self.extra = ()
+        self.add_cards(cards)
+        return delta
+
+    def add_cards(self, cards):
+        """向手牌加入若干张牌"""
+        extra = []
+        for card in cards:
+            index = CARD_INDEX.get(card)
+            if index is None:
+                extra.append(card)
+            else:
+                self.hand[index] += 1
+                self.rank_counts[index >> 2] += 1
+                self.suit_masks[index & 3] |= 1 << (index >> 2)
+                self._update_levels(index >> 2)
+            self.hand_size += 1
+        if extra:
+            self.extra += tuple(extra)
+        self.version += 1
+
+    def remove_cards(self, cards):
+        """从手牌移除若干张牌，返回实际移除的牌"""
+        removed = []
+        extra = list(self.extra)
+        for card in cards:
+            index = CARD_INDEX.get(card)
+            if index is None:
+                if card in extra:
+                    extra.remove(card)
+                    removed.append(card)
+            elif self.hand[index]:
+                self.hand[index] -= 1
+                self.rank_counts[index >> 2] -= 1
+                if not self.hand[index]:
+                    self.suit_masks[index & 3] &= ~(1 << (index >> 2))
+                self._update_levels(index >> 2)
+                removed.append(card)
+        self.hand_size -= len(removed)
+        self.extra = tuple(extra)
+        self.version += 1
+        return removed
+
+    def hand_list(self):
+        """按牌值从小到大返回手牌列表"""
+        if self._cache_version != self.version:
+            cards = []
+            hand = self.hand
+            for index in range(CARD_COUNT):
+                if hand[index]:
+                    cards.extend([CARD_NAMES[index]] * hand[index])
+            # 无法识别的牌牌值为0，排在最前
+            self._hand_cache = list(self.extra) + cards
+            self._cache_version = self.version
+        return list(self._hand_cache)
+
+    def played_list(self):
+        """返回我方已出的牌"""
+        cards = list(self.played_extra)
+        for index in range(CARD_COUNT):
+            if self.played[index]:
+                cards.extend([CARD_NAMES[index]] * self.played[index])
+        return cards
+
+    def set_played(self, cards):
+        """设置我方已出的牌"""
+        self.played = array("B", bytes(CARD_COUNT))
+        extra = []
+        for card in cards:
+            index = CARD_INDEX.get(card)
+            if index is None:
+                extra.append(card)
+            else:
+                self.played[index] += 1
+        self.played_extra = tuple(extra)
+        self.version += 1
+
+    def _update_levels(self, rank):
+        """某个牌值张数变化后更新张数阈值掩码（增量维护）"""
+        count = self.rank_counts[rank]
+        bit = 1 << rank
+        for level in range(1, MAX_LEVEL + 1):
+            if count >= level:
+                self.level_masks[level] |= bit
+            else:
+                self.level_masks[level] &= ~bit
+
+    def runs(self, level, min_length=1):
+        """张数至少为 level 的最大连续牌值段，返回 (起始牌值序号, 长度) 列表"""
+        mask = self.level_masks[level]
+        starts = mask & ~(mask << 1)
+        ends = mask & ~(mask >> 1)
+        result = []
+        while starts:
+            start = (starts & -starts).bit_length() - 1
+            end = (ends & -ends).bit_length() - 1
+            if end - start + 1 >= min_length:
+                result.append((start, end - start + 1))
+            starts &= starts - 1
+            ends &= ends - 1
+        return result
+
+    def straight_flushes(self):
+        """找出所有同花顺，返回 (花色序号, 最小牌值序号) 列表"""
+        result = []
+        for suit_index, mask in enumerate(self.suit_masks):
+            # 连续5位都为1的起始位
+            starts = mask & (mask >> 1) & (mask >> 2) & (mask >> 3) & (mask >> 4)
+            while starts:
+                low = starts & -starts
+                result.append((suit_index, low.bit_length() - 1))
+                starts ^= low
+        return result
+
+    def counts(self):
+        """返回牌值张数元组（搜索使用）"""
+        return tuple(self.rank_counts)
+
+    def snapshot(self):
+        """保存状态快照（只复制定长数组）"""
+        return (self.hand.tobytes(), self.rank_counts.tobytes(), tuple(self.suit_masks),
+                tuple(self.level_masks), self.hand_size, self.extra,
+                self.played.tobytes(), self.played_extra, self.round_cards, self.round_type,
+                self.turn, self.round_count, len(self.history))
+
+    def restore(self, snapshot):
+        """恢复到快照时的状态"""
+        (hand, rank_counts, suit_masks, level_masks, self.hand_size, self.extra,
+         played, self.played_extra, self.round_cards, self.round_type,
+         self.turn, self.round_count, history_len) = snapshot
+        self.hand = array("B", hand)
+        self.rank_counts = array("B", rank_counts)
+        self.suit_masks = list(suit_masks)
+        self.level_masks = list(level_masks)
+        self.played = array("B", played)
+        del self.history[history_len:]
+        self.version += 1
+
+    def play(self, cards):
+        """我方出牌（make move），返回差异"""
+        delta = (self.round_cards, self.round_type, self.turn, self.round_count)
+        removed = self.remove_cards(cards)
+        for card in removed:
+            index = CARD_INDEX.get(card)
+            if index is None:
+                self.played_extra += (card,)
+            else:
+                self.played[index] += 1
+        self.round_count += 1
+        self.turn = OPPONENT
+        self.round_cards = ()
+        self.round_type = None
+        return ("play", removed) + delta
+
+    def unplay(self, delta):
+        """撤销我方出牌（unmake move）"""
+        _, removed, self.round_cards, self.round_type, self.turn, self.round_count = delta
+        played_extra = list(self.played_extra)
+        for card in removed:
+            index = CARD_INDEX.get(card)
+            if index is None:
+                played_extra.remove(card)
+            else:
+                self.played[index] -= 1
+        self.played_extra = tuple(played_extra)
+        self.add_cards(removed)
+
+    def record_round(self, cards, card_type):
+        """记录对手出牌，返回差异"""
+        delta = ("opponent", tuple(cards), card_type, self.round_cards, self.round_type, self.turn)
+        self.history.append((self.round_count, list(cards), card_type))
+        self.round_cards = tuple(cards)
+        self.round_type = card_type
+        self.turn = ME
+        self.version += 1
+        return delta
+
+    def end_round(self):
+        """结束当前轮次并交换出牌方，返回差异"""
+        delta = ("round", self.round_cards, self.round_type, self.turn)
+        self.round_cards = ()
+        self.round_type = None
+        self.turn = OPPONENT if self.turn == ME else ME
+        self.version += 1
+        return delta
+
+    def undo(self, delta):
+        """按差异撤销一次修改"""
+        kind = delta[0]
+        if kind == "play":
+            self.unplay(delta)
+        elif kind == "opponent":
+            _, _, _, self.round_cards, self.round_type, self.turn = delta
+            self.history.pop()
+        elif kind == "round":
+            _, self.round_cards, self.round_type, self.turn = delta
+        elif kind == "hand":
+            (_, self.hand, self.rank_counts, self.suit_masks, self.level_masks,
+             self.hand_size, self.extra, _) = delta
+        self.version += 1
+
+    def redo(self, delta):
+        """按差异重做一次修改，返回新的差异"""
+        kind = delta[0]
+        if kind == "play":
+            return self.play(delta[1])
+        elif kind == "opponent":
+            return self.record_round(delta[1], delta[2])
+        elif kind == "round":
+            return self.end_round()
+        return self.set_hand(delta[7])
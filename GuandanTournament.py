@@ -0,0 +1,282 @@
+import sys
+import math
+import time
+import random
+import argparse
+import importlib
+from itertools import combinations
+from concurrent.futures import ProcessPoolExecutor
+
+# 掼蛋策略对战评测
+#
+# 把四代程序（GuandanAssistan1.py ~ GuandanAssistan4.py）的 GuandanAI 各自作为出牌策略，
+# 按随机种子发牌进行大量两人对局（每副牌交换座位各打一局，抵消牌运），
+# 多进程并行，最后报告胜率及其95%置信区间（Wilson区间）和每秒对局数。
+#
+# 各代接口不同，统一用适配器在每次决策前载入当前局面:
+#   一代  suggest_play() 返回牌列表（可能不合规则）
+#   二、三代  suggest_play() 返回牌列表
+#   四代  suggest_play() 返回候选字典列表，取第一个
+# 策略给出不合规则的出牌时，先手改出最小单张，跟牌视为不出，并计入违规次数。
+
+SUITS = ["红桃", "方块", "梅花", "黑桃"]
+VALUES = ["3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A", "2"]
+MAX_TURNS = 1000  # 单局最多出牌次数（防止策略异常导致死循环）
+BOMB_TYPES = ("bomb", "straight_flush")
+
+
+def load_policy(generation):
+    """加载某一代的出牌策略"""
+    module = importlib.import_module(f"GuandanAssistan{generation}")
+    return Policy(generation, module.GuandanAI())
+
+
+class Policy:
+    """把各代 GuandanAI 包装成统一的决策接口"""
+    def __init__(self, generation, ai):
+        self.generation = generation
+        self.ai = ai
+
+    def choose(self, hand, to_beat, seen):
+        """返回在当前局面下要出的牌（空列表表示不出）"""
+        ai = self.ai
+        if self.generation == 1:
+            ai.update_hand(list(hand))
+            ai.record_opponent_play(list(to_beat))
+            return ai.suggest_play()
+        if self.generation == 4:
+            ai.load_state(hand, to_beat, seen)
+            options = ai.suggest_play(force_recalculate=True)
+            return options[0]["cards"] if options else []
+        ai.reset_game()
+        ai.update_hand(list(hand))
+        ai.played_cards = list(seen)
+        if to_beat:
+            ai.record_opponent_play(list(to_beat))
+        if self.generation == 3:
+            return ai.suggest_play(force_recalculate=True)
+        return ai.suggest_play()
+
+    def seed(self, seed):
+        """为新的一局设置随机种子（四代引擎有自己的随机数生成器）"""
+        if hasattr(self.ai, "rng"):
+            self.ai.rng.seed(seed)
+
+
+class Referee:
+    """按四代引擎的牌型规则判断出牌是否合法"""
+    def __init__(self):
+        from GuandanAssistan4 import GuandanAI
+        self.rules = GuandanAI(endgame_threshold=0)
+
+    def card_type(self, cards):
+        return self.rules._identify_card_type(cards)
+
+    def legal(self, cards, hand, to_beat_type):
+        """cards 是否为手牌中能打出的合法牌型，且能压过 to_beat_type"""
+        remaining = list(hand)
+        for card in cards:
+            if card not in remaining:
+                return False
+            remaining.remove(card)
+        card_type = self.card_type(cards)
+        if card_type["type"] in ("pass", "other"):
+            return False
+        return to_beat_type is None or self.beats(card_type, to_beat_type)
+
+    def beats(self, card_type, target):
+        """card_type 能否压过 target（与四代引擎的压牌规则一致）"""
+        kind, target_kind = card_type["type"], target["type"]
+        if kind in BOMB_TYPES:
+            if target_kind not in BOMB_TYPES:
+                return True
+            return self.rules._bomb_strength(card_type) > self.rules._bomb_strength(target)
+        if kind != target_kind:
+            return False
+        if kind in ("single", "pair", "triple", "full_house"):
+            return card_type["value"] > target["value"]
+        if kind == "sequence":
+            # 允许用更长的顺子压制
+            return (card_type["length"], card_type["max"]) > (target["length"], target["max"])
+        return card_type["length"] == target["length"] and card_type["max"] > target["max"]
+
+
+def deal(seed, hand_size=13, decks=1):
+    """按种子发两手牌，返回 (手牌0, 手牌1, 先手座位)"""
+    rng = random.Random(seed)
+    deck = [suit + value for value in VALUES for suit in SUITS] * decks
+    rng.shuffle(deck)
+    return deck[:hand_size], deck[hand_size:2 * hand_size], rng.randrange(2)
+
+
+def play_game(policies, referee, hands, leader, seed, record=None):
+    """进行一局对局，返回 (获胜座位或None, 各座位违规次数)
+
+    record 不为None时，每次决策后以 (座位, 手牌, 要压的牌型, 双方已出牌, 出的牌) 调用，
+    参数是对局内部的列表，需要保存时应自行复制（自我对弈数据导出使用）。
+    """
+    random.seed(seed)  # 一至三代策略使用全局随机数，固定种子使对局可重现
+    for policy in policies:
+        policy.seed(seed)
+    hands = [sorted(hand, key=referee.rules.card_value) for hand in hands]
+    seen = [[], []]
+    illegal = [0, 0]
+    seat = leader
+    to_beat = []
+    to_beat_type = None
+    for _ in range(MAX_TURNS):
+        try:
+            cards = list(policies[seat].choose(hands[seat], to_beat, seen[seat]) or [])
+        except Exception:
+            cards = None  # 策略内部出错按违规处理
+        if cards and not referee.legal(cards, hands[seat], to_beat_type):
+            cards = None
+        if cards is None:
+            illegal[seat] += 1
+            cards = [] if to_beat else hands[seat][:1]
+        if record is not None:
+            record(seat, hands[seat], to_beat_type, seen, cards)
+
+        if cards:
+            for card in cards:
+                hands[seat].remove(card)
+            seen[seat].extend(cards)
+            if not hands[seat]:
+                return seat, illegal
+            to_beat = cards
+            to_beat_type = referee.card_type(cards)
+        else:
+            # 不出: 本轮结束，对方重新先手
+            to_beat = []
+            to_beat_type = None
+        seat = 1 - seat
+    return None, illegal
+
+
+# 每个工作进程加载一次的策略和裁判
+_policies = {}
+_referee = None
+
+def worker_policies(generations):
+    """返回工作进程内缓存的裁判和各代策略"""
+    global _referee
+    if _referee is None:
+        _referee = Referee()
+    for generation in generations:
+        if generation not in _policies:
+            _policies[generation] = load_policy(generation)
+    return _referee, [_policies[generation] for generation in generations]
+
+
+def _play_match(task):
+    """在工作进程中对同一对策略打若干副牌（每副牌交换座位各打一局）"""
+    first, second, seeds, hand_size, decks = task
+    worker_policies((first, second))
+
+    stats = {"games": 0, "wins": {first: 0, second: 0}, "draws": 0,
+             "illegal": {first: 0, second: 0}}
+    for seed in seeds:
+        hand0, hand1, leader = deal(seed, hand_size, decks)
+        for seats in ((first, second), (second, first)):
+            policies = [_policies[seats[0]], _policies[seats[1]]]
+            winner, illegal = play_game(policies, _referee, (hand0, hand1), leader, seed)
+            stats["games"] += 1
+            if winner is None:
+                stats["draws"] += 1
+            else:
+                stats["wins"][seats[winner]] += 1
+            for seat in (0, 1):
+                stats["illegal"][seats[seat]] += illegal[seat]
+    return first, second, stats
+
+
+def wilson_interval(wins, games, z=1.96):
+    """胜率的Wilson置信区间（默认95%）"""
+    if games == 0:
+        return 0.0, 1.0
+    p = wins / games
+    denominator = 1 + z * z / games
+    center = (p + z * z / (2 * games)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def run_tournament(generations, deals=100, seed=0, workers=None, hand_size=13, decks=1, chunk_size=25):
+    """循环赛：每对策略打 deals 副牌，返回 (各对结果字典, 用时秒数)"""
+    tasks = []
+    for first, second in combinations(generations, 2):
+        for start in range(0, deals, chunk_size):
+            seeds = [seed + i for i in range(start, min(deals, start + chunk_size))]
+            tasks.append((first, second, seeds, hand_size, decks))
+
+    started = time.time()
+    if workers is not None and workers <= 1:
+        results = _merge(map(_play_match, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = _merge(pool.map(_play_match, tasks))
+    return results, time.time() - started
+
+
+def _merge(outputs):
+    """合并各批次的统计"""
+    results = {}
+    for first, second, stats in outputs:
+        total = results.get((first, second))
+        if total is None:
+            results[(first, second)] = stats
+            continue
+        total["games"] += stats["games"]
+        total["draws"] += stats["draws"]
+        for generation in (first, second):
+            total["wins"][generation] += stats["wins"][generation]
+            total["illegal"][generation] += stats["illegal"][generation]
+    return results
+
+
+def report(results, elapsed, out=sys.stdout):
+    """输出对战结果"""
+    total_games = 0
+    overall = {}  # 代数 -> [胜局, 对局]
+    print("对阵            胜率(前者)   95%置信区间       平局  违规(前者/后者)", file=out)
+    for (first, second), stats in sorted(results.items()):
+        games = stats["games"]
+        wins = stats["wins"][first]
+        low, high = wilson_interval(wins, games)
+        total_games += games
+        print(f"{first}代 vs {second}代    {wins / games:6.1%}      [{low:6.1%}, {high:6.1%}]   "
+              f"{stats['draws']:4d}  {stats['illegal'][first]}/{stats['illegal'][second]}", file=out)
+        for generation in (first, second):
+            record = overall.setdefault(generation, [0, 0])
+            record[0] += stats["wins"][generation]
+            record[1] += games
+
+    print("\n总体胜率", file=out)
+    for generation, (wins, games) in sorted(overall.items()):
+        low, high = wilson_interval(wins, games)
+        print(f"{generation}代  {wins}/{games}  {wins / games:6.1%}  [{low:6.1%}, {high:6.1%}]", file=out)
+    rate = total_games / elapsed if elapsed > 0 else 0.0
+    print(f"\n共{total_games}局，用时{elapsed:.1f}秒，{rate:.1f}局/秒", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="掼蛋各代策略对战评测")
+    parser.add_argument("--generations", type=int, nargs="+", default=[1, 2, 3, 4],
+                        choices=[1, 2, 3, 4], help="参赛的程序代数")
+    parser.add_argument("--deals", type=int, default=100, help="每对策略的发牌数（每副牌交换座位打两局）")
+    parser.add_argument("--seed", type=int, default=0, help="起始随机种子")
+    parser.add_argument("--workers", type=int, default=None, help="对局进程数（默认CPU核数，0或1表示不使用进程池）")
+    parser.add_argument("--hand-size", type=int, default=13, help="每人手牌张数")
+    parser.add_argument("--decks", type=int, default=1, help="使用几副牌")
+    args = parser.parse_args(argv)
+
+    generations = sorted(set(args.generations))
+    if len(generations) < 2:
+        parser.error("至少需要两代策略")
+    results, elapsed = run_tournament(generations, args.deals, args.seed, args.workers,
+                                      args.hand_size, args.decks)
+    report(results, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# 各模块都是仓库根目录下的独立脚本，测试时把根目录加入导入路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
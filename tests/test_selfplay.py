@@ -0,0 +1,15 @@
+import os
+from GuandanSelfPlay import DatasetWriter
+
+
+def test_writer_continues_after_highest_chunk(tmp_path):
+    """已有分块有缺号、目录里留有临时文件时，新分块接在最大编号之后，不覆盖已有分块"""
+    for name in ("selfplay-00002.npz", "selfplay-00001.tmp.npz"):
+        (tmp_path / name).write_bytes(b"")
+    writer = DatasetWriter(str(tmp_path))
+    assert writer._next_index == 3
+
+
+def test_writer_starts_at_zero_in_empty_directory(tmp_path):
+    writer = DatasetWriter(os.path.join(str(tmp_path), "out"))
+    assert writer._next_index == 0
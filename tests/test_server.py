@@ -0,0 +1,35 @@
+import json
+import asyncio
+from GuandanServer import SuggestionServer
+
+
+async def _exchange(requests):
+    """在一条连接上依次发送请求，返回各条响应"""
+    server = SuggestionServer(workers=0)
+    listener = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        responses = []
+        for request in requests:
+            writer.write(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+            await writer.drain()
+            responses.append(json.loads(await reader.readline()))
+        writer.close()
+        return responses
+    finally:
+        listener.close()
+        server.shutdown()
+
+
+def test_invalid_requests_keep_connection_open():
+    """字段不合法的请求得到错误响应，同一连接上的后续请求照常处理"""
+    responses = asyncio.run(_exchange([
+        {"id": 1, "table": "t", "op": "hand", "cards": 5},
+        {"id": 2, "table": ["t"], "op": "hand", "cards": ["红桃5"]},
+        {"id": 3, "table": "t", "op": "hand", "cards": ["红桃5", 7]},
+        {"id": 4, "table": "t", "op": "hand", "cards": ["红桃5", "方块6"], "suggest": True},
+    ]))
+    assert [response["ok"] for response in responses] == [False, False, False, True]
+    assert [response["id"] for response in responses] == [1, 2, 3, 4]
+    assert responses[3]["suggestions"]
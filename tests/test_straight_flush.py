@@ -0,0 +1,38 @@
+import random
+from GuandanAssistan4 import GuandanAI, suggest_many
+
+HEART_FLUSH = ["红桃4", "红桃5", "红桃6", "红桃7", "红桃8"]
+PLAIN_STRAIGHT = ["方块10", "黑桃J", "红桃Q", "方块K", "黑桃A"]
+
+
+def make_ai(hand, endgame_threshold=8):
+    ai = GuandanAI(rng=random.Random(0), endgame_threshold=endgame_threshold)
+    ai.update_hand(hand)
+    return ai
+
+
+def test_lead_does_not_offer_straight_flush_as_sequence():
+    """同花顺的牌不能换成别的花色时，先手的顺子选项不会是这手同花顺"""
+    ai = make_ai(HEART_FLUSH + ["方块J", "梅花J", "黑桃K"], endgame_threshold=0)
+    for option in ai.suggest_play(force_recalculate=True):
+        if option["type"] == "sequence":
+            assert sorted(option["cards"]) != sorted(HEART_FLUSH)
+        if sorted(option["cards"]) == sorted(HEART_FLUSH):
+            assert option["type"] == "straight_flush"
+
+
+def test_counter_sequence_prefers_plain_straight():
+    """压顺子时用普通顺子，不拆出同花顺"""
+    ai = make_ai(HEART_FLUSH + PLAIN_STRAIGHT)
+    ai.record_opponent_play(["方块3", "梅花4", "黑桃5", "方块6", "梅花7"])
+    options = ai.suggest_play(force_recalculate=True)
+    assert sorted(options[0]["cards"]) == sorted(PLAIN_STRAIGHT)
+    assert options[0]["type"] == "sequence"
+
+
+def test_endgame_labels_straight_flush():
+    """残局求解（不区分花色）给出的顺子正是同花顺时按同花顺报告"""
+    hand = ["红桃3", "红桃4", "红桃5", "红桃6", "红桃7"]
+    suggestions = suggest_many([{"hand": hand}])[0]
+    assert sorted(suggestions[0]["cards"]) == sorted(hand)
+    assert suggestions[0]["type"] == "straight_flush"
@@ -0,0 +1,51 @@
+import random
+from GuandanAssistan4 import GuandanAI
+
+HAND = ["红桃3", "方块5", "梅花7", "黑桃9", "红桃J"]
+OPPONENT = ["方块4", "梅花6", "黑桃8", "红桃10"]
+
+
+def make_ai():
+    ai = GuandanAI(rng=random.Random(0))
+    ai.update_hand(HAND)
+    return ai
+
+
+def test_undo_after_clearing_opponent_hand():
+    """对手出牌后又清除已知手牌，撤销/重做按顺序恢复各步的对手手牌"""
+    ai = make_ai()
+    ai.record_opponent_hand(OPPONENT)
+    ai.record_opponent_play(["方块4"])
+    ai.record_opponent_hand(None)
+
+    assert ai.undo()
+    assert ai.opponent_hand_cards == OPPONENT[1:]
+    assert ai.undo()
+    assert ai.opponent_hand_cards == OPPONENT
+    assert ai.current_round_cards == []
+    assert ai.undo()
+    assert ai.opponent_hand_cards is None
+
+    assert ai.redo()
+    assert ai.opponent_hand_cards == OPPONENT
+    assert ai.redo()
+    assert ai.opponent_hand_cards == OPPONENT[1:]
+    assert ai.redo()
+    assert ai.opponent_hand_cards is None
+
+
+def test_undo_after_replacing_opponent_hand():
+    """换成新的已知手牌后撤销，不会把旧手牌的牌并入新手牌"""
+    ai = make_ai()
+    ai.record_opponent_hand(OPPONENT)
+    ai.record_opponent_play(["方块4"])
+    ai.record_opponent_hand(["黑桃A", "黑桃K"])
+
+    assert ai.undo()
+    assert ai.opponent_hand_cards == OPPONENT[1:]
+    assert ai.redo()
+    assert ai.opponent_hand_cards == ["黑桃A", "黑桃K"]
+    assert ai.undo() and ai.undo()
+    assert ai.opponent_hand_cards == OPPONENT
+    assert ai.redo() and ai.redo()
+    assert ai.opponent_hand_cards == ["黑桃A", "黑桃K"]